@@ -0,0 +1,52 @@
+# Micro-benchmark: FuzzyIndex.search against the difflib.get_close_matches path it replaced.
+#   python benchmarks/bench_fuzzy.py [--words 50000] [--queries 200]
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fixtures import synthetic_names  # noqa: E402
+from fuzzy import FuzzyIndex  # noqa: E402
+
+
+def typo(word, rng):
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]  # Swap two adjacent characters
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    options = parser.parse_args()
+
+    rng = random.Random(2)
+    words = synthetic_names(options.words)
+    queries = [typo(rng.choice(words), rng) for _ in range(options.queries)]
+
+    started = time.perf_counter()
+    index = FuzzyIndex(words)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexed = [index.search(query, k=1, cutoff=0.7) for query in queries]
+    index_time = (time.perf_counter() - started) / len(queries)
+
+    difflib_queries = queries[:max(1, len(queries) // 20)]  # difflib is far slower; sample it
+    started = time.perf_counter()
+    expected = [difflib.get_close_matches(query, words, n=1, cutoff=0.7) for query in difflib_queries]
+    difflib_time = (time.perf_counter() - started) / len(difflib_queries)
+
+    agree = sum(1 for got, want in zip(indexed, expected) if [word for _, word in got] == want)
+    print(f"words: {len(words)}  index build: {build_time * 1000:.1f} ms")
+    print(f"FuzzyIndex.search:         {index_time * 1000:8.3f} ms/query")
+    print(f"difflib.get_close_matches: {difflib_time * 1000:8.3f} ms/query ({len(difflib_queries)} sampled)")
+    print(f"speedup: {difflib_time / index_time:.0f}x  same top suggestion: {agree}/{len(difflib_queries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# Synthetic fixtures for the benchmark suite. Everything is generated from a fixed seed, and the
+# slow-to-build fixtures (file trees, big text files) are reused while their parameters match.
+import json
+import os
+import random
+import socket
+import string
+from contextlib import contextmanager
+
+SCALES = {
+    # tree_files: files in the walked tree; flat_files: entries in the completion/suggestion directory
+    "small": {"tree_files": 10_000, "flat_files": 10_000, "text_bytes": 64 << 20, "diff_lines": 100_000, "diff_changes": 200},
+    "medium": {"tree_files": 100_000, "flat_files": 50_000, "text_bytes": 512 << 20, "diff_lines": 500_000, "diff_changes": 1_000},
+    "large": {"tree_files": 1_000_000, "flat_files": 200_000, "text_bytes": 2 << 30, "diff_lines": 1_000_000, "diff_changes": 5_000},
+}
+FILES_PER_DIR = 1000
+STEMS = ["report", "config", "backup", "invoice", "photo", "notes", "build", "release", "data", "log"]
+EXTENSIONS = [".txt", ".py", ".log", ".csv", ".json", ".png", ".zip"]
+
+
+def synthetic_names(count, seed=1):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        stem = rng.choice(STEMS) + "_" + "".join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(3, 10)))
+        names.add(stem + rng.choice(EXTENSIONS))
+    return sorted(names)
+
+
+def _fresh(path, params):
+    # True if the fixture at path was built with the same parameters
+    try:
+        with open(os.path.join(path, ".fixture.json")) as file:
+            return json.load(file) == params
+    except (OSError, ValueError):
+        return False
+
+
+def _mark(path, params):
+    with open(os.path.join(path, ".fixture.json"), "w") as file:
+        json.dump(params, file)
+
+
+def _touch_all(directory, names):
+    for name in names:
+        os.close(os.open(os.path.join(directory, name), os.O_CREAT | os.O_WRONLY, 0o644))
+
+
+def file_tree(root, count):
+    # root/d0000 ... with FILES_PER_DIR files each, for dir walks
+    params = {"kind": "tree", "count": count}
+    if _fresh(root, params):
+        return root
+    os.makedirs(root, exist_ok=True)
+    for start in range(0, count, FILES_PER_DIR):
+        directory = os.path.join(root, f"d{start // FILES_PER_DIR:04d}")
+        os.makedirs(directory, exist_ok=True)
+        _touch_all(directory, (f"file_{i:07d}.txt" for i in range(start, min(count, start + FILES_PER_DIR))))
+    _mark(root, params)
+    return root
+
+
+def flat_directory(root, count):
+    # One directory with count realistic names, for completion and typo suggestions
+    params = {"kind": "flat", "count": count}
+    if _fresh(root, params):
+        return root
+    os.makedirs(root, exist_ok=True)
+    _touch_all(root, synthetic_names(count))
+    _mark(root, params)
+    return root
+
+
+def text_file(path, size, seed=3):
+    # Log-like text of exactly `size` bytes, written in blocks of about 1 MiB
+    meta = path + ".fixture.json"
+    params = {"kind": "text", "size": size, "seed": seed}
+    try:
+        with open(meta) as file:
+            if json.load(file) == params and os.path.exists(path):
+                return path
+    except (OSError, ValueError):
+        pass
+    rng = random.Random(seed)
+    words = ["INFO", "WARN", "ERROR", "request", "handled", "user", "timeout", "cache", "miss", "retry", "ok"]
+    block = "".join(f"{i:08d} {' '.join(rng.choices(words, k=rng.randint(4, 14)))}\n" for i in range(20_000))
+    block = block.encode()
+    with open(path, "wb") as file:
+        written = 0
+        while written < size:
+            chunk = block[:size - written]
+            file.write(chunk)
+            written += len(chunk)
+    with open(meta, "w") as file:
+        json.dump(params, file)
+    return path
+
+
+def diff_pair(directory, lines, changes, seed=4):
+    # Two files of `lines` lines that differ by `changes` scattered edits
+    params = {"kind": "diff", "lines": lines, "changes": changes, "seed": seed}
+    os.makedirs(directory, exist_ok=True)
+    left, right = os.path.join(directory, "left.txt"), os.path.join(directory, "right.txt")
+    if _fresh(directory, params):
+        return left, right
+    rng = random.Random(seed)
+    original = [f"line {i} {rng.getrandbits(48):012x}\n" for i in range(lines)]
+    changed = list(original)
+    for _ in range(changes):
+        i = rng.randrange(len(changed))
+        action = rng.random()
+        if action < 0.4:
+            changed[i] = f"edited {rng.getrandbits(32):08x}\n"
+        elif action < 0.7:
+            changed.insert(i, f"inserted {rng.getrandbits(32):08x}\n")
+        elif len(changed) > 1:
+            del changed[i]
+    with open(left, "w") as file:
+        file.writelines(original)
+    with open(right, "w") as file:
+        file.writelines(changed)
+    _mark(directory, params)
+    return left, right
+
+
+@contextmanager
+def tcp_listeners(count=8):
+    # Local listening sockets for listports to find; yields their port numbers
+    sockets = []
+    try:
+        for _ in range(count):
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(128)
+            sockets.append(listener)
+        yield sorted(listener.getsockname()[1] for listener in sockets)
+    finally:
+        for listener in sockets:
+            listener.close()
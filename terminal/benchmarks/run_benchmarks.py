@@ -0,0 +1,391 @@
+# Benchmark suite: command latency, output throughput and completion speed on synthetic fixtures.
+#   python benchmarks/run_benchmarks.py [--scale small|medium|large] [--repeat 5] [--only dir,diff]
+#                                      [--output results.json] [--compare baseline.json] [--threshold 0.15]
+# Commands run through the headless Session exactly as typed at the prompt; results are written
+# as JSON (median/min/p95 per benchmark) so two versions can be compared with --compare.
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+import fixtures  # noqa: E402
+from completion import CompletionEngine  # noqa: E402
+from config import settings  # noqa: E402
+from diskusage import UsageCache  # noqa: E402
+from lineindex import LineIndex  # noqa: E402
+from session import Session  # noqa: E402
+from store import HistoryStore  # noqa: E402
+from viewer import MappedFile  # noqa: E402
+from vtscreen import Screen  # noqa: E402
+
+
+class Skipped(Exception):
+    # Raised by a benchmark's setup when it cannot run here
+    pass
+
+
+class CountingOutput:
+    # Session output sink that only counts what it is given
+    def __init__(self):
+        self.chars = 0
+        self.writes = 0
+
+    def write(self, text, tag=None):
+        self.chars += len(text)
+        self.writes += 1
+
+    def clear(self):
+        pass
+
+
+def run_command(session, line):
+    session.run(line)
+    while not session.pump(limit=4096, wait=0.05):
+        pass
+
+
+def measure(function, repeat, warmup=1):
+    # Runs function() warmup + repeat times; returns timing stats and the last call's extra metrics
+    extra = {}
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        extra = function() or {}
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    result = {
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": samples[0] * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))] * 1000,
+        "stdev_ms": (statistics.stdev(samples) if len(samples) > 1 else 0.0) * 1000,
+        "runs": repeat,
+    }
+    result.update(extra)
+    return result
+
+
+def bench_dir(ctx):
+    session = Session(CountingOutput(), current_directory=ctx["tree"])
+
+    def run():
+        session.output.chars = 0
+        run_command(session, "dir")
+        return {"files": ctx["scale"]["tree_files"], "output_chars": session.output.chars}
+    return run
+
+
+def bench_diskusage(ctx):
+    # Cold: every directory of the tree is scanned
+    session = Session(CountingOutput(), current_directory=ctx["tree"])
+
+    def run():
+        session.usage_cache = UsageCache()
+        run_command(session, "diskusage .")
+        return {"files": ctx["scale"]["tree_files"]}
+    return run
+
+
+def bench_diskusage_cached(ctx):
+    # Repeat run over an unchanged tree: one stat() per directory, no scandir
+    session = Session(CountingOutput(), current_directory=ctx["tree"])
+    run_command(session, "diskusage .")
+    return lambda: run_command(session, "diskusage .")
+
+
+def bench_edit_inline(ctx):
+    session = Session(CountingOutput(), current_directory=ctx["root"])
+    return lambda: run_command(session, "edit inline.txt")
+
+
+def bench_viewer_open(ctx):
+    # What the viewer does for a file too big to show inline: map it, detect the encoding, draw a
+    # page at the top, jump to a line in the middle and page to the end
+    path = ctx["text"]
+
+    def run():
+        mapped = MappedFile(path)
+        try:
+            for _, data in mapped.lines_from(0, 60):
+                mapped.decode(data)
+            middle = mapped.offset_of_line(mapped.line_number(mapped.size // 2))
+            mapped.lines_from(middle, 60)
+            mapped.lines_from(mapped.back(mapped.size, 59), 60)
+        finally:
+            mapped.close()
+        return {"bytes": os.path.getsize(path)}
+    return run
+
+
+def bench_diff(ctx):
+    session = Session(CountingOutput(), current_directory=ctx["diff_dir"])
+
+    def run():
+        session.output.chars = 0
+        run_command(session, "diff left.txt right.txt")
+        return {"lines": ctx["scale"]["diff_lines"], "changes": ctx["scale"]["diff_changes"], "output_chars": session.output.chars}
+    return run
+
+
+def bench_listports(ctx):
+    session = Session(CountingOutput(), current_directory=ctx["root"])
+    listeners = ctx["listeners"]
+    low = max(1, listeners[0] - 500)
+    spec = f"{low}-{low + 999}," + ",".join(map(str, listeners))
+
+    def run():
+        run_command(session, f"listports 127.0.0.1 {spec} --timeout 0.2")
+        return {"ports": len(range(low, low + 1000)), "listening": len(listeners)}
+    return run
+
+
+def bench_vt_parse(ctx):
+    # What a program's output costs on the pseudo-terminal reader thread: 16 MiB of the log with
+    # the \r\n line endings a terminal delivers, parsed into an 80x24 screen in 64 KiB reads
+    with open(ctx["text"], "rb") as file:
+        data = file.read(16 << 20).decode("utf-8", "replace").replace("\n", "\r\n")
+
+    def run():
+        screen = Screen(24, 80)
+        for start in range(0, len(data), 65536):
+            screen.feed(data[start:start + 65536])
+            screen.take_scrolled()
+        return {"chars": len(data)}
+    return run
+
+
+def bench_scrollback_search(ctx):
+    # Ctrl-F / filter over the log as scrollback: a phrase, a lowercase word (smart case, so it
+    # also finds "WARN") and a regex, each over every line
+    with open(ctx["text"], "r", encoding="utf-8", errors="replace") as file:
+        lines = file.read(16 << 20).split("\n")
+    index = LineIndex()
+    index.extend(lines)
+    index.search("warmup")  # Joins the blocks once, as the first search after new output does
+
+    def run():
+        found = sum(len(index.search(query, regex)) for query, regex in (("miss handled", False), ("warn", False), (r"ERROR \w+ timeout", True)))
+        return {"lines": len(lines), "matches": found}
+    return run
+
+
+def bench_history_search(ctx):
+    # Up and Ctrl-R lookups against a history database with 100,000 commands: the newest entry, a
+    # substring found near the end, one found only at the start and one that is not there at all
+    path = os.path.join(ctx["root"], "history.db")
+    if os.path.exists(path):
+        os.remove(path)
+    store = HistoryStore(path, max_entries=0)
+    names = fixtures.synthetic_names(1000)
+    store.db.execute("BEGIN")
+    store.record("first-command --only-once", ctx["root"], 0.0, 0.1, 0)
+    for i in range(100_000):
+        store.record(f"edit {names[i % len(names)]} --line {i}", ctx["root"], float(i), 0.1, 0)
+    store.db.execute("COMMIT")
+
+    def run():
+        lookups = 0
+        for _ in range(100):
+            entry = store.previous()
+            store.previous(entry[0], entry[1])
+            store.search("line 99")
+            store.search("only-once")
+            store.search("no such command")
+            lookups += 5
+        return {"entries": 100_001, "lookups": lookups}
+    return run
+
+
+def bench_autocomplete(ctx):
+    # Path completion against the flat directory, the same lookup Tab does on its worker thread
+    session = Session(CountingOutput(), current_directory=ctx["flat"])
+    engine = CompletionEngine(session.dir_cache)
+    prefixes = [stem[:k] for stem in fixtures.STEMS for k in (1, 3, 5)]
+    engine.match_paths("", ctx["flat"], 1)  # Snapshot the directory once, as the startup warm-up does
+
+    def run():
+        for prefix in prefixes:
+            engine.match_paths(prefix, ctx["flat"], settings['completion_limit'])
+        return {"lookups": len(prefixes), "entries": ctx["scale"]["flat_files"]}
+    return run
+
+
+def bench_autocomplete_cold(ctx):
+    session = Session(CountingOutput(), current_directory=ctx["flat"])
+    engine = CompletionEngine(session.dir_cache)
+
+    def run():
+        session.dir_cache.invalidate()
+        engine.match_paths("rep", ctx["flat"], settings['completion_limit'])
+        return {"entries": ctx["scale"]["flat_files"]}
+    return run
+
+
+def bench_suggest_correction(ctx):
+    session = Session(CountingOutput(), current_directory=ctx["flat"])
+    names = fixtures.synthetic_names(ctx["scale"]["flat_files"])
+    typos = [name[:3] + name[4] + name[3] + name[5:] for name in names[::max(1, len(names) // 50)]]
+    session.suggest_correction("dri")  # Builds the command index and the directory's fuzzy indexes
+
+    def run():
+        for typo in typos:
+            session.suggest_correction(typo)
+        return {"queries": len(typos), "entries": ctx["scale"]["flat_files"]}
+    return run
+
+
+def bench_text_insert(ctx):
+    # Raw throughput of OutputBuffer into a real Text widget, with scrollback trimming on
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:  # No display (TclError) or no Tk at all
+        raise Skipped(f"needs a display: {e}")
+    from output import OutputBuffer
+    root.withdraw()
+    widget = tk.Text(root, undo=False, maxundo=0)
+    widget.pack()
+    buffer = OutputBuffer(widget)
+    buffer.set_scrollback(settings['scrollback_lines'], settings['scrollback_chars'], settings['scrollback_trim_batch'])
+    line = "x" * 79 + "\n"
+    lines = 200_000
+
+    def run():
+        for i in range(lines):
+            buffer.write(line, "success" if i % 10 == 0 else None)
+        while buffer.pending:
+            buffer.flush(buffer.max_chars_per_frame)
+            root.update_idletasks()
+        return {"chars": lines * len(line)}
+    return run
+
+
+BENCHMARKS = {
+    "dir": bench_dir,
+    "diskusage": bench_diskusage,
+    "diskusage_cached": bench_diskusage_cached,
+    "edit_inline": bench_edit_inline,
+    "viewer_open": bench_viewer_open,
+    "diff": bench_diff,
+    "listports": bench_listports,
+    "vt_parse": bench_vt_parse,
+    "scrollback_search": bench_scrollback_search,
+    "history_search": bench_history_search,
+    "autocomplete": bench_autocomplete,
+    "autocomplete_cold": bench_autocomplete_cold,
+    "suggest_correction": bench_suggest_correction,
+    "text_insert": bench_text_insert,
+}
+
+
+def build_fixtures(root, scale):
+    ctx = {"root": root, "scale": scale}
+    ctx["tree"] = fixtures.file_tree(os.path.join(root, "tree"), scale["tree_files"])
+    ctx["flat"] = fixtures.flat_directory(os.path.join(root, "flat"), scale["flat_files"])
+    ctx["text"] = fixtures.text_file(os.path.join(root, "big.log"), scale["text_bytes"])
+    fixtures.text_file(os.path.join(root, "inline.txt"), settings['viewer_inline_limit'] // 2)
+    ctx["diff_dir"] = os.path.join(root, "diff")
+    fixtures.diff_pair(ctx["diff_dir"], scale["diff_lines"], scale["diff_changes"])
+    return ctx
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold):
+    # Prints a comparison table to stderr; returns the names that got slower than threshold allows
+    regressions = []
+    for name, result in results["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or "median_ms" not in old or "median_ms" not in result:
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:20} {old['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms  ({ratio:5.2f}x){flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nebula Terminal benchmark suite")
+    parser.add_argument("--scale", choices=sorted(fixtures.SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="comma separated benchmark names")
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "nebula-bench-fixtures"),
+                        help="where fixtures are built (kept between runs)")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="earlier results JSON to compare medians against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="slowdown ratio counted as a regression")
+    options = parser.parse_args()
+
+    names = options.only.split(",") if options.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    scale = fixtures.SCALES[options.scale]
+    root = os.path.join(options.fixtures, options.scale)
+    os.makedirs(root, exist_ok=True)
+    started = time.perf_counter()
+    ctx = build_fixtures(root, scale)
+    print(f"fixtures ready in {time.perf_counter() - started:.1f}s ({root})", file=sys.stderr)
+
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": options.scale,
+            "fixtures": scale,
+            "repeat": options.repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+    with fixtures.tcp_listeners() as listeners:
+        ctx["listeners"] = listeners
+        for name in names:
+            try:
+                run = BENCHMARKS[name](ctx)
+            except Skipped as e:
+                results["results"][name] = {"skipped": str(e)}
+                print(f"{name:20} skipped: {e}", file=sys.stderr)
+                continue
+            result = measure(run, options.repeat)
+            results["results"][name] = result
+            print(f"{name:20} median {result['median_ms']:10.2f} ms  min {result['min_ms']:10.2f} ms", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if options.output:
+        with open(options.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if options.compare:
+        with open(options.compare) as file:
+            regressions = compare(results, json.load(file), options.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,171 @@
+import importlib
 
+
+class Command:
+    # One entry in the command table. The handler is given as "module:function" and only
+    # imported the first time the command runs, so heavy modules stay out of startup.
+    def __init__(self, name, handler, usage, summary, help_text=None, category="General", min_args=0, max_args=None, aliases=()):
+        self.name = name
+        self.handler = handler
+        self.usage = usage
+        self.summary = summary
+        self.help_text = help_text or f"{usage}: {summary}"
+        self.category = category
+        self.min_args = min_args
+        self.max_args = max_args
+        self.aliases = tuple(aliases)
+        self._function = None
+
+    def resolve(self):
+        if self._function is None:
+            if callable(self.handler):
+                self._function = self.handler
+            else:
+                module_name, function_name = self.handler.split(":")
+                self._function = getattr(importlib.import_module(module_name), function_name)
+        return self._function
+
+    def accepts(self, args):
+        if len(args) < self.min_args:
+            return False
+        return self.max_args is None or len(args) <= self.max_args
+
+    def __call__(self, terminal, args):
+        return self.resolve()(terminal, args)
+
+
+class CommandRegistry:
+    def __init__(self):
+        self.commands = {}  # Primary names and aliases both map to their Command
+        self.categories = {}  # Category -> primary command names in registration order
+
+    def register(self, command):
+        for name in (command.name,) + command.aliases:
+            self.commands[name] = command
+        self.categories.setdefault(command.category, []).append(command.name)
+        return command
+
+    def add(self, name, handler, usage, summary, **options):
+        return self.register(Command(name, handler, usage, summary, **options))
+
+    def get(self, name):
+        return self.commands.get(name)
+
+    def __contains__(self, name):
+        return name in self.commands
+
+    def names(self):
+        return list(self.commands)
+
+    def general_help(self):
+        lines = []
+        for category, names in self.categories.items():
+            lines.append(f"{category} Commands:")
+            for name in names:
+                command = self.commands[name]
+                label = ", ".join((command.usage,) + command.aliases)
+                lines.append(f"  {label}: {command.summary}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def detailed_help(self, name):
+        command = self.get(name)
+        if command is None:
+            return f"No detailed help available for: {name}"
+        return command.help_text + "\n"
+
+
+def parse_options(args, value_options=(), flag_options=()):
+    # Split "--name value" / "--flag" options out of a command's arguments.
+    # Returns (positional, options); raises ValueError for a value option with no value.
+    positional = []
+    options = {}
+    i = 0
+    while i < len(args):
+        name = args[i][2:] if args[i].startswith("--") else None
+        if name in value_options:
+            if i + 1 >= len(args):
+                raise ValueError(f"Missing value for --{name}")
+            options.setdefault(name, []).append(args[i + 1])
+            i += 2
+        elif name in flag_options:
+            options[name] = True
+            i += 1
+        else:
+            positional.append(args[i])
+            i += 1
+    return positional, options
+
+
+registry = CommandRegistry()
+
+# General
+registry.add("help", "core_commands:help_command", "help", "Show this help message",
+             help_text="help: Show this help message or detailed help for a specific command.", max_args=1)
+registry.add("date", "core_commands:date_command", "date", "Display the current date and time")
+registry.add("exit", "core_commands:exit_command", "exit", "Go to a previous directory",
+             help_text="exit: Exit the terminal or go to the previous directory.")
+registry.add("go", "core_commands:go_command", "go <path>", "Navigate to a directory",
+             help_text="go <path>: Navigate to the specified directory path.", min_args=1)
+registry.add("cls", "core_commands:clear_command", "cls", "Clear the terminal screen",
+             help_text="cls, clear: Clear the terminal screen.", aliases=("clear",))
+registry.add("jobs", "core_commands:jobs_command", "jobs", "List background jobs",
+             help_text="jobs: List background jobs. End any command with & to run it in the background, e.g. 'diff a.txt b.txt &'.",
+             max_args=0)
+registry.add("fg", "core_commands:fg_command", "fg [job]", "Bring a background job to the foreground",
+             help_text="fg [job]: Show the output of a background job (the latest one by default) and follow it until it finishes.",
+             max_args=1)
+registry.add("kill", "core_commands:kill_command", "kill <job>", "Stop a background job", min_args=1, max_args=1)
+
+# File management
+registry.add("dir", "file_commands:dir_command", "dir [path]", "List the contents of the current directory",
+             help_text="dir [path] [--depth <n>] [--include <glob>] [--exclude <glob>] [--sort name|size|mtime|none] [--reverse] [--dirs]: "
+                       "List all files (and with --dirs, directories) under the current directory.", category="File Management")
+registry.add("edit", "file_commands:edit_command", "edit <file>", "Open and display the contents of a file",
+             help_text="edit <file> [--line <n>] [--tail] [--hex] [--view]: Open and display the contents of the specified file. "
+                       "Large or binary files open in the paged viewer.", category="File Management", min_args=1)
+registry.add("mkdir", "file_commands:mkdir_command", "mkdir <directory_name>", "Create a new directory",
+             help_text="mkdir <directory_name>: Create a new directory with the specified name.", category="File Management", min_args=1)
+registry.add("open", "system_commands:open_command", "open", "Open the current directory in the system's default file manager",
+             category="File Management")
+registry.add("openfile", "file_commands:openfile_command", "openfile <file_path>", "Open and display the contents of a file",
+             help_text="openfile <file_path> [--line <n>] [--tail] [--hex] [--view]: Open and display the contents of the specified file. "
+                       "Large or binary files open in the paged viewer.", category="File Management", min_args=1)
+registry.add("rename", "file_commands:rename_command", "rename <old_file_path> <new_file_path>", "Rename a file or directory.",
+             category="File Management", min_args=2)
+registry.add("diff", "file_commands:diff_command", "diff <file1> <file2>", "Compare the contents of two files",
+             help_text="diff <file1> <file2> [--context <n>] [--ignore-whitespace] [--side-by-side]: Compare two files. "
+                       "Hunks are shown as they are found; Ctrl-C stops a long comparison.", category="File Management", min_args=2)
+
+# Utility
+registry.add("code", "system_commands:code_command", "code", "Open the current directory in Visual Studio Code", category="Utility")
+registry.add("echo", "core_commands:echo_command", "echo <text>", "Print the specified text",
+             help_text="echo <text>: Print the specified text to the terminal.", category="Utility")
+registry.add("stats", "core_commands:stats_command", "stats [on|off|reset|trace <file>|trace off]", "Show command timings and event loop lag",
+             help_text="stats [on|off|reset|trace <file>|trace off]: Show p50/p95/p99 timings, CPU time and output per command "
+                       "and the event loop lag. 'stats on' starts recording; 'stats trace <file>' also writes a Chrome trace.",
+             category="Utility", max_args=2)
+registry.add("filter", "core_commands:filter_command", "filter <pattern>", "Show the scrollback lines that match a pattern",
+             help_text="filter <pattern> [--regex]: Print the scrollback lines containing pattern (a regular expression with --regex), "
+                       "with their line numbers. Lowercase patterns ignore case. Ctrl-F searches the scrollback in place.",
+             category="Utility", min_args=1)
+registry.add("settings", "core_commands:settings_command", "settings -<setting> <value>", "Change the specified setting",
+             help_text="settings -<setting> <value>: Change the specified setting to the given value. The change is saved and applies "
+                       "again the next time the terminal starts.", category="Utility", min_args=2)
+registry.add("tasklist", "system_commands:tasklist_command", "tasklist", "Display all running processes",
+             help_text="tasklist: Display all currently running processes.", category="Utility")
+registry.add("systeminfo", "system_commands:systeminfo_command", "systeminfo", "Display system information",
+             help_text="systeminfo: Display detailed system information.", category="Utility")
+registry.add("diskusage", "system_commands:diskusage_command", "diskusage [path]", "Display disk usage of the root filesystem or a directory tree",
+             help_text="diskusage [path] [--top <n>] [--threads <n>]: Without a path, show usage of the root filesystem. With one, add up "
+                       "the space used under it and list the largest entries. Repeat runs only rescan directories that changed.",
+             category="Utility", max_args=5)
+registry.add("issue", "network_commands:issue_command", "issue <issue_text>", "Submit an issue to the Nebula Terminal Development Community",
+             category="Utility", min_args=1)
+registry.add("ping", "system_commands:ping_command", "ping <target>", "Ping the specified target", category="Utility", min_args=1)
+registry.add("ssh", "system_commands:ssh_command", "ssh <target>", "Establish an SSH connection to the specified target",
+             category="Utility", min_args=1)
+registry.add("listports", "network_commands:listports_command", "listports [host] [ports]", "List all open ports on the system",
+             help_text="listports [host] [ports] [--timeout <seconds>] [--concurrency <n>]: Scan a host (default localhost) for open ports, e.g. 'listports 10.0.0.5 22,80,8000-8100'.",
+             category="Utility", max_args=6)
+registry.add("git", "system_commands:git_command", "git <command>", "Execute a git command.", category="Utility", min_args=1)
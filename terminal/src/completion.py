@@ -0,0 +1,159 @@
+import fnmatch
+import os
+import queue
+import threading
+
+
+class PrefixTrie:
+    # Character trie where every node keeps its own best `keep` completions, so a lookup only
+    # walks the prefix and never scans the subtree below it
+    def __init__(self, keep=20):
+        self.keep = keep
+        self.root = {}
+        self.weights = {}
+
+    def add(self, word, weight=1):
+        total = self.weights.get(word, 0) + weight
+        self.weights[word] = total
+        node = self.root
+        self._rank(node, word, total)
+        for char in word:
+            node = node.setdefault(char, {})
+            self._rank(node, word, total)
+
+    def _rank(self, node, word, weight):
+        top = node.get(None)
+        if top is None:
+            top = node[None] = []  # The None key holds (weight, word) pairs, never a character
+        for i, (_, existing) in enumerate(top):
+            if existing == word:
+                del top[i]
+                break
+        if len(top) >= self.keep and (-weight, word) >= (-top[-1][0], top[-1][1]):
+            return  # Ranks below the last kept word, ties going by name as in the sort below
+        top.append((weight, word))
+        top.sort(key=lambda item: (-item[0], item[1]))
+        del top[self.keep:]
+
+    def remove(self, word):
+        # A node's best list is the best of its children's lists (plus the word ending there), so
+        # only the nodes on the word's path are rebuilt, bottom up; emptied nodes are dropped
+        if self.weights.pop(word, None) is None:
+            return False
+        path = [self.root]
+        for char in word:
+            path.append(path[-1][char])
+        for depth in range(len(word), -1, -1):
+            node = path[depth]
+            prefix = word[:depth]
+            top = [(self.weights[prefix], prefix)] if prefix in self.weights else []
+            for char, child in node.items():
+                if char is not None:
+                    top.extend(child[None])
+            top.sort(key=lambda item: (-item[0], item[1]))
+            del top[self.keep:]
+            if top or depth == 0:
+                node[None] = top
+            else:
+                del path[depth - 1][word[depth - 1]]
+        return True
+
+    def complete(self, prefix, limit=None):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return [word for _, word in node.get(None, [])[:limit or self.keep]]
+
+    def __len__(self):
+        return len(self.weights)
+
+
+def common_prefix(words):
+    return os.path.commonprefix(words) if words else ""
+
+
+class CompletionEngine:
+    # Command and history completion come from tries on the Tk thread. Path completion reads the
+    # directory cache on a worker thread; results come back through a queue the UI polls.
+    def __init__(self, dir_cache, keep=50):
+        self.dir_cache = dir_cache
+        self.commands = PrefixTrie(keep)
+        self.history = PrefixTrie(keep)
+        self.results = queue.Queue()
+        self.requests = queue.Queue()
+        self.generation = 0
+        threading.Thread(target=self._path_worker, daemon=True).start()
+
+    def set_commands(self, names):
+        self.commands = PrefixTrie(self.commands.keep)
+        for name in names:
+            self.commands.add(name)
+
+    def record(self, line):
+        # Called for every executed command line; frequent commands rank higher
+        parts = line.split()
+        if not parts:
+            return
+        self.history.add(line.strip())
+        if parts[0] in self.commands.weights:
+            self.commands.add(parts[0])
+
+    def load_history(self, counts):
+        # (line, times run) pairs from the history store, so completion remembers earlier sessions
+        for line, count in counts:
+            self.history.add(line, count)
+
+    def complete_command(self, prefix, limit):
+        matches = self.commands.complete(prefix, limit)
+        for line in self.history.complete(prefix, limit):
+            if len(matches) >= limit:
+                break
+            if line not in matches:
+                matches.append(line)
+        return matches
+
+    def request_paths(self, text, current_directory, limit):
+        # Queue a path lookup; only the result of the newest request is reported
+        self.generation += 1
+        self.requests.put((self.generation, text, current_directory, limit))
+        return self.generation
+
+    def poll(self):
+        # Returns (generation, matches) of the newest finished lookup, or None
+        latest = None
+        while True:
+            try:
+                latest = self.results.get_nowait()
+            except queue.Empty:
+                break
+        if latest is None or latest[0] != self.generation:
+            return None
+        return latest
+
+    def _path_worker(self):
+        while True:
+            request = self.requests.get()
+            while not self.requests.empty():  # Skip lookups that are already out of date
+                request = self.requests.get()
+            generation, text, current_directory, limit = request
+            try:
+                matches = self.match_paths(text, current_directory, limit)
+            except OSError:
+                matches = ([], 0)
+            self.results.put((generation, matches))
+
+    def match_paths(self, text, current_directory, limit):
+        # Returns (first `limit` matches, total number of matches) for a partially typed path
+        directory, prefix = os.path.split(os.path.expanduser(text))
+        base = directory if os.path.isabs(directory) else os.path.join(current_directory, directory)
+        snapshot = self.dir_cache.get(base)
+        if snapshot is None:
+            return [], 0
+        if '*' in prefix or '?' in prefix:
+            names = sorted(name for name in snapshot.entries if fnmatch.fnmatch(name, prefix))
+            names, total = names[:limit], len(names)
+        else:
+            names, total = snapshot.complete(prefix, limit)
+        return [os.path.join(directory, name) + (os.sep if snapshot.is_dir(name) else "") for name in names], total
@@ -10,7 +10,60 @@ settings = {
     'scroll_speed': 1.0,
     'text_antialiasing': True,
     'padding': 10,
-    'margin': 5
+    'margin': 5,
+    'command_timeouts': {  # Seconds before an external command is stopped, 0 = no limit
+        'ping': 30,
+        'ssh': 0,
+        'tasklist': 30,
+        'systeminfo': 60,
+        'code': 15,
+        'git': 0,
+    },
+    'process_poll_interval': 30,  # Milliseconds between reads of a running command's output
+    'output_frame_ms': 16,  # Output is written to the screen at most once per frame (~60 fps)
+    'scrollback_lines': 10000,  # Lines kept in the terminal before the oldest are dropped, 0 = unlimited
+    'scrollback_chars': 8000000,  # Character cap for the scrollback (about bytes for ASCII output), 0 = unlimited
+    'scrollback_trim_batch': 500,  # Old lines are removed in batches of at least this many
+    'portscan_ports': '1-1024',  # Default port range for listports
+    'portscan_timeout': 0.5,  # Seconds to wait for each connection attempt
+    'portscan_concurrency': 256,  # Connection attempts in flight at once
+    'dir_max_depth': None,  # How deep dir recurses by default, None = no limit
+    'dir_exclude': ['__pycache__'],  # Glob patterns dir skips (matching directories are not entered)
+    'dir_sort': 'name',  # Options: 'name', 'size', 'mtime', 'none'
+    'dir_page_size': 500,  # Entries dir sends to the screen at a time
+    'dir_cache_size': 64,  # Directory listings kept for autocomplete and suggestions
+    'diskusage_threads': 8,  # Worker threads walking the tree for diskusage <path>
+    'diskusage_top': 15,  # Largest entries diskusage <path> lists
+    'diskusage_cache_dirs': 200000,  # Directories whose sizes are remembered between diskusage runs
+    'suggestion_cutoff': 0.7,  # How similar (0-1) a name must be to be offered as a correction
+    'completion_limit': 20,  # Most entries shown in the Tab completion dropdown
+    'history_max_entries': 200000,  # Commands kept in the history database (Up/Down, Ctrl-R), 0 = unlimited
+    'history_completion_lines': 500,  # Recent history lines Tab completion learns from at startup
+    'viewer_inline_limit': 262144,  # Files larger than this (bytes) open in the paged viewer instead of the terminal
+    'viewer_poll_ms': 500,  # How often the viewer checks a file for appended data
+    'diff_context': 3,  # Unchanged lines shown around each change
+    'diff_width': 60,  # Column width of each side in diff --side-by-side
+    'diff_max_cost': 256,  # Edit steps tried per region before settling for a non-minimal diff, 0 = no limit
+    'report_startup_time': False,  # Print the time to first prompt to stderr (same as running with --startup-time)
+    'instrumentation': False,  # Record per-command timings and event loop lag from startup (see the stats command)
+    'lag_probe_ms': 250,  # How often the event loop lag probe runs while instrumentation is on
+    'trace_file': '',  # If set, write a Chrome trace of commands and loop lag to this file (turns instrumentation on)
+    'theme': 0,  # Id from themes.galaxy_themes; a light theme colour is used to highlight paths
+    'highlight': True,  # Colour paths, URLs, numbers and error words in command output
+    'highlight_lines_per_pass': 500,  # Most lines tokenized per frame, so big outputs stay smooth
+    'max_jobs': 4,  # Background jobs (command &) running at once; later ones wait for a free slot
+    'job_buffer_chars': 1000000,  # Output kept per background job until it is brought back with fg
+    'pty_passthrough': True,  # Run unknown commands that are programs on PATH in a pseudo-terminal
+    'pty_fps': 30,  # Most screen repaints per second for programs running in the pseudo-terminal
+    'pty_scrolled_lines': 5000,  # Lines that scrolled by kept between repaints; faster output is skipped
+    'search_max_matches': 10000,  # Most Ctrl-F matches highlighted at once (those around the current match)
+    'filter_max_lines': 500,  # Most matching lines filter prints (the most recent ones)
+    'highlight_colors': {
+        'path': '#7FDBFF',
+        'url': '#00BFFF',
+        'number': '#FFD700',
+        'error': '#FF5555'
+    }
 }
 
 # Will be used later on for customizable terminal settings
\ No newline at end of file
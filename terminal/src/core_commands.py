@@ -0,0 +1,183 @@
+import os
+import re
+import time
+
+from config import settings
+
+
+def help_command(term, args):
+    from commands import registry
+    if not args:
+        term.output.write("\n\n" + registry.general_help())
+    else:
+        term.output.write("\n\n" + registry.detailed_help(args[0]))
+
+
+def date_command(term, args):
+    try:
+        current_date = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        term.output.write(f"\n\nCurrent date and time: {current_date}\n")
+    except Exception as e:
+        term.output.write(f"\nFailed to get current date and time: {str(e)}\n")
+        return 1
+
+
+def exit_command(term, args):
+    term.current_directory = os.path.expanduser("~")
+    term.dir_cache.warm(term.current_directory)
+
+
+def go_command(term, args):
+    target_dir = args[0]
+    if os.path.isabs(target_dir):
+        new_path = target_dir
+    else:
+        new_path = os.path.join(term.current_directory, target_dir)
+    if os.path.exists(new_path):
+        term.current_directory = new_path
+        term.dir_cache.warm(new_path)  # Completion and suggestions for the new directory are ready sooner
+    else:
+        term.output.write(f"\nDirectory not found: {new_path}. Please check the path and try again.\n")
+        return 1
+
+
+def clear_command(term, args):
+    term.output.clear()
+
+
+def echo_command(term, args):
+    echo_text = " ".join(args)
+    term.output.write(f"\n{echo_text}\n")
+
+
+def settings_command(term, args):
+    setting_key = args[0].lstrip('-')
+    setting_value = args[1]
+    if setting_key in settings and isinstance(settings[setting_key], (int, float, str)):
+        try:
+            if isinstance(settings[setting_key], bool):  # bool("False") would be True
+                if setting_value.lower() not in ("true", "false", "on", "off", "1", "0", "yes", "no"):
+                    raise ValueError(setting_value)
+                settings[setting_key] = setting_value.lower() in ("true", "on", "1", "yes")
+            else:
+                value = type(settings[setting_key])(setting_value)
+                if not isinstance(value, str) and value < 0:
+                    raise ValueError(setting_value)  # Sizes, counts, intervals and limits (0 = none) are never negative
+                settings[setting_key] = value
+        except ValueError:
+            term.output.write(f"\nInvalid setting or value type for: {setting_key}. Please check the setting name and value type.\n")
+            return 1
+        term.apply_settings()  # Reapply settings to update the terminal
+        term.apply_output_settings()
+        term.output.write(f"\nSetting updated: {setting_key} = {setting_value}\n")
+        try:
+            term.save_setting(setting_key, settings[setting_key])
+        except OSError as e:
+            term.output.write(f"Failed to save the setting, it only applies until the terminal is closed: {str(e)}\n", "error")
+    else:
+        term.output.write(f"\nInvalid setting or value type for: {setting_key}. Please check the setting name and value type.\n")
+        return 1
+
+
+def filter_command(term, args):
+    # Searched before anything is written, so the command's own output is never matched
+    from commands import parse_options
+    index = term.scrollback
+    if index is None:
+        term.output.write("\nNo scrollback to filter.\n")
+        return 1
+    positional, options = parse_options(args, flag_options=("regex",))
+    pattern = " ".join(positional)
+    if not pattern:  # An empty pattern matches every line
+        term.output.write("\nUsage: filter <pattern>\n")
+        return 2
+    try:
+        matches = index.search(pattern, regex="regex" in options)
+    except re.error as e:
+        term.output.write(f"\nBad pattern: {str(e)}\n", "error")
+        return 1
+    lines = {}  # Line number -> [(start, end)], in order
+    for line, start, end in matches:
+        lines.setdefault(line, []).append((start, end))
+    if not lines:
+        term.output.write(f"\nNo lines match: {pattern}\n")
+        return 1
+    shown = list(lines.items())[-settings['filter_max_lines']:]
+    more = f", showing the last {len(shown)}" if len(shown) < len(lines) else ""
+    term.output.write(f"\n\n{len(matches)} matches on {len(lines)} lines{more}:\n")
+    width = len(str(shown[-1][0]))
+    for line, spans in shown:
+        text = index.line(line)
+        term.output.write(f"{line:>{width}}: ")
+        position = 0
+        for start, end in spans:
+            term.output.write(text[position:start])
+            term.output.write(text[start:end], "bold")
+            position = end
+        term.output.write(text[position:] + "\n")
+
+
+def stats_command(term, args):
+    metrics = term.metrics
+    action = args[0] if args else None
+    if action is None:
+        if not metrics.enabled and not metrics.commands:
+            term.output.write("\nInstrumentation is off. Use 'stats on' to start recording.\n")
+        else:
+            state = "" if metrics.enabled else " (recording is off)"
+            term.output.write(f"\n\nCommand statistics{state}:\n" + metrics.report())
+    elif action == "on":
+        metrics.enable(term)
+        term.output.write("\nInstrumentation on.\n")
+    elif action == "off":
+        metrics.disable()
+        term.output.write("\nInstrumentation off.\n")
+    elif action == "reset":
+        metrics.reset()
+        term.output.write("\nStatistics cleared.\n")
+    elif action == "trace" and len(args) == 2:
+        if args[1] == "off":
+            path = metrics.stop_trace()
+            term.output.write(f"\nTrace written to {path}\n" if path else "\nNo trace is being written.\n")
+            return
+        path = os.path.join(term.current_directory, args[1])
+        try:
+            metrics.start_trace(path)
+        except OSError as e:
+            term.output.write(f"\nFailed to start trace: {str(e)}\n")
+            return 1
+        metrics.enable(term)
+        term.output.write(f"\nTracing commands to {path}. Use 'stats trace off' to finish the file.\n")
+    else:
+        term.output.write("\nUsage: stats [on|off|reset|trace <file>|trace off]\n")
+        return 1
+
+
+def jobs_command(term, args):
+    jobs = list(term.jobs.jobs.values())
+    if not jobs:
+        term.output.write("\nNo background jobs.\n")
+        return
+    lines = [f"\n{'Job':>5}  {'State':10} {'Time':>8} {'Lines':>7}  Command"]
+    for job in jobs:
+        lines.append(f"{'[' + str(job.id) + ']':>5}  {job.state:10} {job.elapsed():7.1f}s {job.output.lines:7d}  {job.line}")
+    term.output.write("\n".join(lines) + "\n")
+
+
+def fg_command(term, args):
+    job = term.jobs.find(args[0] if args else None)
+    if job is None:
+        term.output.write(f"\nNo such job: {args[0]}\n" if args else "\nNo background jobs.\n", "error")
+        return 1
+    term.jobs.foreground(job)
+
+
+def kill_command(term, args):
+    job = term.jobs.find(args[0])
+    if job is None:
+        term.output.write(f"\nNo such job: {args[0]}\n", "error")
+        return 1
+    elif term.jobs.kill(job):
+        term.output.write(f"\nStopping job [{job.id}]\n")
+    else:
+        term.output.write(f"\nJob [{job.id}] has already finished.\n")
@@ -0,0 +1,265 @@
+import time
+
+
+def read_lines(path):
+    with open(path, 'r', errors="replace") as file:
+        return file.readlines()
+
+
+def intern_lines(lines_a, lines_b, ignore_whitespace=False):
+    # Map each distinct line (or its whitespace-free form) to a small int so the diff compares ints
+    ids = {}
+    if ignore_whitespace:
+        keys_a = ["".join(line.split()) for line in lines_a]
+        keys_b = ["".join(line.split()) for line in lines_b]
+    else:
+        keys_a, keys_b = lines_a, lines_b
+    a = [ids.setdefault(key, len(ids)) for key in keys_a]
+    b = [ids.setdefault(key, len(ids)) for key in keys_b]
+    return a, b
+
+
+def _bisect(a, a0, a1, b, b0, b1, max_cost):
+    # Linear-space Myers: walk forward and reverse D-paths until they meet and return the split
+    # point (x, y). If max_cost steps pass without meeting, split at the furthest forward point;
+    # the diff stays correct, it just may not be minimal for that stretch. max_cost <= 0 = no limit.
+    n, m = a1 - a0, b1 - b0
+    max_d = (n + m + 1) // 2
+    offset = max_d
+    length = 2 * max_d + 2
+    v1 = [-1] * length
+    v2 = [-1] * length
+    v1[offset + 1] = 0
+    v2[offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+    best = (0, 0)
+    for d in range(max_d):
+        if 0 < max_cost < d:
+            return best
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a0 + x1] == b[b0 + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1end += 2  # Ran off the right of the graph
+            elif y1 > m:
+                k1start += 2  # Ran off the bottom of the graph
+            else:
+                if x1 + y1 > best[0] + best[1]:
+                    best = (x1, y1)
+                if front:
+                    k2_offset = offset + delta - k1
+                    if 0 <= k2_offset < length and v2[k2_offset] != -1 and x1 >= n - v2[k2_offset]:
+                        return x1, y1
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a1 - x2 - 1] == b[b1 - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2  # Ran off the left of the graph
+            elif y2 > m:
+                k2start += 2  # Ran off the top of the graph
+            elif not front:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return x1, y1
+    return None  # Nothing in common
+
+
+def matching_runs(a, b, max_cost=256, should_stop=None):
+    # Yields (i, j, size) runs of equal lines in increasing order, ending with (len(a), len(b), 0).
+    # Lines that never occur in the other file cannot match, so they are dropped before the search
+    # (as GNU diff does); a file rewritten from scratch then costs one pass instead of a full Myers run.
+    in_b, in_a = set(b), set(a)
+    keep_a = [i for i, value in enumerate(a) if value in in_b]
+    keep_b = [j for j, value in enumerate(b) if value in in_a]
+    if len(keep_a) == len(a) and len(keep_b) == len(b):
+        yield from _runs(a, b, max_cost, should_stop)
+        return
+    for i, j, size in _runs([a[i] for i in keep_a], [b[j] for j in keep_b], max_cost, should_stop):
+        if not size:
+            break
+        start = 0  # A run of kept lines is only a real run where no dropped line sat between them
+        for k in range(1, size + 1):
+            if k == size or keep_a[i + k] != keep_a[i + k - 1] + 1 or keep_b[j + k] != keep_b[j + k - 1] + 1:
+                yield keep_a[i + start], keep_b[j + start], k - start
+                start = k
+    else:
+        return  # Stopped early
+    yield len(a), len(b), 0
+
+
+def _runs(a, b, max_cost, should_stop):
+    # Sub-problems are worked depth-first, left half first, so runs come out as soon as they are known
+    stack = [("range", 0, len(a), 0, len(b))]
+    while stack:
+        if should_stop is not None and should_stop():
+            return
+        item = stack.pop()
+        if item[0] == "run":
+            if item[3]:
+                yield item[1:]
+            continue
+        _, a0, a1, b0, b1 = item
+        start = 0  # Common prefix
+        while a0 + start < a1 and b0 + start < b1 and a[a0 + start] == b[b0 + start]:
+            start += 1
+        if start:
+            yield a0, b0, start
+            a0 += start
+            b0 += start
+        end = 0  # Common suffix
+        while a1 - end > a0 and b1 - end > b0 and a[a1 - end - 1] == b[b1 - end - 1]:
+            end += 1
+        if end:
+            stack.append(("run", a1 - end, b1 - end, end))
+            a1 -= end
+            b1 -= end
+        if a0 == a1 or b0 == b1:
+            continue  # Pure insertion or deletion
+        split = _bisect(a, a0, a1, b, b0, b1, max_cost)
+        if split is None:
+            continue
+        x, y = split
+        if (x, y) in ((0, 0), (a1 - a0, b1 - b0)):
+            continue  # Gave up before finding anything to split on: the region is one replace
+        stack.append(("range", a0 + x, a1, b0 + y, b1))
+        stack.append(("range", a0, a0 + x, b0, b0 + y))
+    yield len(a), len(b), 0
+
+
+def opcodes(runs):
+    # difflib-style (tag, i1, i2, j1, j2) opcodes from matching runs
+    i = j = 0
+    for ai, bj, size in runs:
+        if i < ai and j < bj:
+            yield "replace", i, ai, j, bj
+        elif i < ai:
+            yield "delete", i, ai, j, bj
+        elif j < bj:
+            yield "insert", i, ai, j, bj
+        if size:
+            yield "equal", ai, ai + size, bj, bj + size
+        i, j = ai + size, bj + size
+
+
+def grouped_opcodes(codes, context=3):
+    # Streaming version of SequenceMatcher.get_grouped_opcodes: a hunk is yielded as soon as an
+    # unchanged stretch longer than 2 * context closes it
+    group = []
+    last_equal = None
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal":
+            if not group:
+                last_equal = (tag, i1, i2, j1, j2)
+            elif i2 - i1 > 2 * context:
+                group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+                yield group
+                group = []
+                last_equal = (tag, i1, i2, j1, j2)
+            else:
+                group.append((tag, i1, i2, j1, j2))
+            continue
+        if not group and last_equal is not None:
+            _, e1, e2, f1, f2 = last_equal
+            group.append(("equal", max(e1, e2 - context), e2, max(f1, f2 - context), f2))
+        group.append((tag, i1, i2, j1, j2))
+    if group:
+        tag, i1, i2, j1, j2 = group[-1]
+        if tag == "equal":
+            group[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+        yield group
+
+
+def _format_range(start, stop):
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def unified_hunk(group, lines_a, lines_b):
+    # [(text, tag)] for one unified-diff hunk
+    first, last = group[0], group[-1]
+    out = [(f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@\n", "bold")]
+    for tag, i1, i2, j1, j2 in group:
+        if tag == "equal":
+            out.extend((" " + _line(line), None) for line in lines_a[i1:i2])
+            continue
+        out.extend(("-" + _line(line), "error") for line in lines_a[i1:i2])
+        out.extend(("+" + _line(line), "success") for line in lines_b[j1:j2])
+    return out
+
+
+def side_by_side_hunk(group, lines_a, lines_b, width=60):
+    first, last = group[0], group[-1]
+    out = [(f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@\n", "bold")]
+    for tag, i1, i2, j1, j2 in group:
+        left, right = lines_a[i1:i2], lines_b[j1:j2]
+        marker = {"equal": " ", "replace": "|", "delete": "<", "insert": ">"}[tag]
+        row_tag = None if tag == "equal" else ("error" if tag == "delete" else "success" if tag == "insert" else "bold")
+        for k in range(max(len(left), len(right))):
+            left_text = _cell(left[k], width) if k < len(left) else " " * width
+            right_text = _cell(right[k], width).rstrip() if k < len(right) else ""
+            out.append((f"{left_text} {marker} {right_text}\n", row_tag))
+    return out
+
+
+def _line(line):
+    return line if line.endswith("\n") else line + "\n\\ No newline at end of file\n"
+
+
+def _cell(line, width):
+    text = line.rstrip("\r\n").expandtabs(4)
+    return text[:width].ljust(width)
+
+
+def diff_task(task, path_a, path_b, context, ignore_whitespace, side_by_side, width, max_cost):
+    # BackgroundTask target used by the diff command; hunks are written as they are found
+    started = time.perf_counter()
+    lines_a = read_lines(path_a)
+    lines_b = read_lines(path_b)
+    a, b = intern_lines(lines_a, lines_b, ignore_whitespace)
+    runs = matching_runs(a, b, max_cost, lambda: task.stopped)
+    hunks = 0
+    for group in grouped_opcodes(opcodes(runs), context):
+        if task.stopped:
+            return 1
+        if not hunks:
+            task.write(f"\nDifferences between {path_a} and {path_b}:\n")
+            if not side_by_side:
+                task.write(f"--- {path_a}\n+++ {path_b}\n", "bold")
+        hunk = side_by_side_hunk(group, lines_a, lines_b, width) if side_by_side else unified_hunk(group, lines_a, lines_b)
+        for text, tag in hunk:
+            task.write(text, tag)
+        hunks += 1
+    if task.stopped:
+        return 1
+    elapsed = time.perf_counter() - started
+    if hunks:
+        task.write(f"\n{hunks} hunk{'s' if hunks != 1 else ''} ({len(lines_a)} vs {len(lines_b)} lines) in {elapsed:.2f}s\n")
+    else:
+        task.write(f"\nNo differences found between {path_a} and {path_b}.\n")
+    return 0
@@ -0,0 +1,106 @@
+import bisect
+import os
+import threading
+from collections import OrderedDict
+
+
+class DirectorySnapshot:
+    # Names and entry types of one directory, taken from a single os.scandir pass
+    def __init__(self, path, mtime_ns, entries):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.entries = entries  # name -> True for directories, False for everything else
+        self.dirs = [name for name, is_dir in entries.items() if is_dir]
+        self.files = [name for name, is_dir in entries.items() if not is_dir]
+        self._fuzzy = {}
+        self._sorted = None
+
+    def names(self):
+        return list(self.entries)
+
+    def is_dir(self, name):
+        return self.entries.get(name, False)
+
+    def complete(self, prefix, limit=None):
+        # Names starting with prefix as (first `limit` names, total matches). The sorted name
+        # array does a trie's prefix lookup with two bisections and no per-character nodes.
+        if self._sorted is None:
+            self._sorted = sorted(self.entries)
+        start = bisect.bisect_left(self._sorted, prefix)
+        end = bisect.bisect_left(self._sorted, prefix + "\U0010ffff")
+        stop = end if limit is None else min(end, start + limit)
+        return self._sorted[start:stop], end - start
+
+    def fuzzy_index(self, kind):
+        # kind is "dirs" or "files"; built once per snapshot, so a changed directory gets a new one
+        index = self._fuzzy.get(kind)
+        if index is None:
+            from fuzzy import FuzzyIndex  # Only needed once a name fails to complete
+            index = self._fuzzy[kind] = FuzzyIndex(getattr(self, kind))
+        return index
+
+
+class DirectoryCache:
+    # Per-directory LRU cache of snapshots. A lookup costs one stat() of the directory;
+    # the listing is only re-read when the directory's mtime has changed.
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.snapshots = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            self.invalidate(path)
+            return None
+        with self.lock:
+            snapshot = self.snapshots.get(path)
+            if snapshot is not None and snapshot.mtime_ns == mtime_ns:
+                self.snapshots.move_to_end(path)
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+        snapshot = self._scan(path, mtime_ns)
+        if snapshot is not None:
+            with self.lock:
+                self.snapshots[path] = snapshot
+                self.snapshots.move_to_end(path)
+                while len(self.snapshots) > self.max_entries:
+                    self.snapshots.popitem(last=False)
+        return snapshot
+
+    def _scan(self, path, mtime_ns):
+        entries = {}
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    try:
+                        entries[entry.name] = entry.is_dir()
+                    except OSError:
+                        entries[entry.name] = False
+        except OSError:
+            return None
+        return DirectorySnapshot(path, mtime_ns, entries)
+
+    def warm(self, path):
+        # Fill the cache for path on a worker thread (used when the current directory changes)
+        thread = threading.Thread(target=self._warm, args=(path,), daemon=True)
+        thread.start()
+        return thread
+
+    def _warm(self, path):
+        snapshot = self.get(path)
+        if snapshot is not None:
+            snapshot.fuzzy_index("dirs")
+            snapshot.fuzzy_index("files")
+
+    def invalidate(self, path=None):
+        with self.lock:
+            if path is None:
+                self.snapshots.clear()
+            else:
+                self.snapshots.pop(os.path.abspath(path), None)
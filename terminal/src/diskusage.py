@@ -0,0 +1,207 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+KEEP_FILES = 50  # Largest files remembered per directory, the most --top can show from one directory
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _usage(stat):
+    # Space allocated on disk where the platform reports it (like du), else the apparent size
+    blocks = getattr(stat, "st_blocks", None)
+    return blocks * 512 if blocks is not None else stat.st_size
+
+
+class DirectoryUsage:
+    # What one scandir pass over a directory found: its own files and the subdirectories to visit.
+    # bytes counts the directory itself and its files, not its subdirectories.
+    __slots__ = ("mtime_ns", "bytes", "file_count", "subdirs", "largest")
+
+    def __init__(self, mtime_ns, own_bytes, file_count, subdirs, largest):
+        self.mtime_ns = mtime_ns
+        self.bytes = own_bytes
+        self.file_count = file_count
+        self.subdirs = subdirs  # Names
+        self.largest = largest  # [(size, name)] of the biggest files, largest first
+
+
+class UsageCache:
+    # Per-directory scan results keyed by the directory's mtime. Adding, removing or renaming an
+    # entry changes a directory's mtime, so a repeat scan re-reads only those directories and takes
+    # the rest from here after one stat() each. A file that grows in place does not change its
+    # directory's mtime and keeps its cached size until something else in that directory changes.
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path, mtime_ns):
+        with self.lock:
+            usage = self.entries.get(path)
+            if usage is None or usage.mtime_ns != mtime_ns:
+                return None
+            self.entries.move_to_end(path)
+            return usage
+
+    def put(self, path, usage):
+        with self.lock:
+            self.entries[path] = usage
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class UsageScan:
+    # Walks a tree with worker threads, one directory per work item. Each directory is looked up in
+    # the cache by mtime and only scanned when missing or changed. Totals are kept as running sums
+    # so partial results can be reported while the workers are still going.
+    def __init__(self, root, cache, workers=8, should_stop=None):
+        self.root = root
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.should_stop = should_stop or (lambda: False)
+        self.device = os.stat(root).st_dev  # Other filesystems mounted below root are not entered
+        self.results = {}  # path -> DirectoryUsage, for every directory visited
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.outstanding = 0
+        self.bytes = 0
+        self.files = 0
+        self.dirs = 0
+        self.cached = 0
+        self.errors = []
+
+    def run(self):
+        self._add(self.root)
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _add(self, path):
+        with self.lock:
+            self.outstanding += 1
+        self.queue.put(path)
+
+    def _work(self):
+        while not self.done.is_set():
+            try:
+                path = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if not self.should_stop():
+                self._visit(path)
+            with self.lock:
+                self.outstanding -= 1
+                if self.outstanding == 0 or self.should_stop():
+                    self.done.set()
+
+    def _visit(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            self._error(path, e)
+            return
+        usage = self.cache.get(path, stat.st_mtime_ns)
+        cached = usage is not None
+        if usage is None:
+            usage = self._scan(path, stat)
+            if usage is None:
+                return
+            self.cache.put(path, usage)
+        self.results[path] = usage
+        with self.lock:
+            self.bytes += usage.bytes
+            self.files += usage.file_count
+            self.dirs += 1
+            self.cached += cached
+        for name in usage.subdirs:
+            self._add(os.path.join(path, name))
+
+    def _scan(self, path, stat):
+        file_bytes, file_count = _usage(stat), 0
+        subdirs = []
+        largest = []
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    try:
+                        entry_stat = entry.stat(follow_symlinks=False)
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry_stat.st_dev == self.device:
+                                subdirs.append(entry.name)
+                            continue
+                    except OSError:
+                        continue
+                    size = _usage(entry_stat)
+                    file_bytes += size
+                    file_count += 1
+                    largest.append((size, entry.name))
+        except OSError as e:
+            self._error(path, e)
+            return None
+        largest.sort(reverse=True)
+        return DirectoryUsage(stat.st_mtime_ns, file_bytes, file_count, subdirs, largest[:KEEP_FILES])
+
+    def _error(self, path, e):
+        with self.lock:
+            self.errors.append((path, e))
+
+    def total(self, path):
+        # Size of everything under path that was visited, directories included
+        total = 0
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            usage = self.results.get(current)
+            if usage is None:
+                continue
+            total += usage.bytes
+            stack.extend(os.path.join(current, name) for name in usage.subdirs)
+        return total
+
+    def top_entries(self, count):
+        # Largest direct children of root as (size, name, is_dir), subdirectories with their totals
+        usage = self.results.get(self.root)
+        if usage is None:
+            return []
+        entries = [(size, name, False) for size, name in usage.largest]
+        entries.extend((self.total(os.path.join(self.root, name)), name, True) for name in usage.subdirs)
+        entries.sort(reverse=True)
+        return entries[:count]
+
+
+def usage_task(task, root, cache, workers, top, progress_s):
+    # BackgroundTask target used by diskusage <path>: partial totals while the workers run, then
+    # the largest entries directly under root
+    started = time.perf_counter()
+    scan = UsageScan(root, cache, workers, lambda: task.stopped)
+    scan.run()
+    while not scan.done.wait(progress_s):
+        task.write(f"  ... {scan.dirs:,} directories, {scan.files:,} files, {format_size(scan.bytes)} so far\n")
+    if task.stopped:
+        return 1
+    elapsed = time.perf_counter() - started
+    for size, name, is_dir in scan.top_entries(top):
+        share = size / scan.bytes * 100 if scan.bytes else 0.0
+        task.write(f"{format_size(size):>10}  {share:5.1f}%  {name}{os.sep if is_dir else ''}\n", "bold" if is_dir else None)
+    for path, e in scan.errors[:10]:
+        task.write(f"Cannot read {path}: {e.strerror or e}\n", "error")
+    if len(scan.errors) > 10:
+        task.write(f"... and {len(scan.errors) - 10} more unreadable directories\n", "error")
+    task.write(f"\nTotal {format_size(scan.bytes)} in {scan.files:,} files and {scan.dirs:,} directories "
+               f"({scan.cached:,} directories unchanged since the last scan) in {elapsed:.2f}s\n")
+    return 1 if scan.errors else 0
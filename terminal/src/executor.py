@@ -0,0 +1,345 @@
+import codecs
+import locale
+import os
+import queue
+import subprocess
+import threading
+import time
+
+
+class EventSource:
+    # Base of the runners: each puts (kind, data) events on self.events from its worker threads
+    # ("stdout", "stderr", "write", "timeout", "screen", "exit"), and the frontend drains them.
+    def read_events(self, limit=256, wait=None):
+        # Returns whatever is queued, at most `limit` events per call. Non-blocking unless
+        # `wait` is given, in which case it waits up to that many seconds for the first event.
+        events = []
+        if wait:
+            try:
+                events.append(self.events.get(timeout=wait))
+            except queue.Empty:
+                return events
+        while len(events) < limit:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+
+class ProcessRunner(EventSource):
+    # Runs a child process off the Tk thread; output chunks are collected on a queue
+    # that the UI drains with after() so the mainloop never blocks on the child.
+    def __init__(self, argv, cwd=None, timeout=None, encoding=None, kill_grace=2.0, max_pending=1024):
+        self.argv = argv
+        self.cwd = cwd
+        self.timeout = timeout or None  # 0 / None means no limit
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.kill_grace = kill_grace
+        self.process = None
+        self.returncode = None
+        self.cancelled = False
+        self.timed_out = False
+        # Bounded, so a chatty child blocks on its pipe instead of filling memory when the UI lags
+        self.events = queue.Queue(maxsize=max_pending)
+        self._readers = []
+
+    def start(self):
+        # Popen errors (e.g. FileNotFoundError) are raised here so callers can report them
+        self.process = subprocess.Popen(
+            self.argv,
+            cwd=self.cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        for stream, kind in ((self.process.stdout, "stdout"), (self.process.stderr, "stderr")):
+            reader = threading.Thread(target=self._read_stream, args=(stream, kind), daemon=True)
+            reader.start()
+            self._readers.append(reader)
+        threading.Thread(target=self._wait, daemon=True).start()
+        return self
+
+    def _read_stream(self, stream, kind):
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        try:
+            while True:
+                chunk = stream.read1(4096)
+                if not chunk:
+                    break
+                text = decoder.decode(chunk)
+                if text:
+                    self.events.put((kind, text.replace("\r\n", "\n")))
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                self.events.put((kind, tail))
+        except (OSError, ValueError):
+            pass  # Pipe closed underneath us after a kill
+        finally:
+            stream.close()
+
+    def _wait(self):
+        try:
+            self.process.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            self.timed_out = True
+            self.events.put(("timeout", self.timeout))
+            self._stop()
+            self.process.wait()
+        # Grandchildren can keep the pipes open, so don't wait on the readers forever
+        for reader in self._readers:
+            reader.join(timeout=1.0)
+        self.returncode = self.process.returncode
+        self.events.put(("exit", self.returncode))
+
+    def _stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=self.kill_grace)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        except OSError:
+            pass
+
+    def cancel(self):
+        if self.process is None or self.process.poll() is not None:
+            return False
+        self.cancelled = True
+        threading.Thread(target=self._stop, daemon=True).start()
+        return True
+
+    def running(self):
+        return self.process is not None and self.returncode is None
+
+
+class BackgroundTask(EventSource):
+    # Runs a Python function on a worker thread with the same event interface as ProcessRunner.
+    # The function is called as target(task, *args); it reports through task.write() and should
+    # return early once task.stopped is set. Its return value becomes the exit code.
+    def __init__(self, target, *args, timeout=None, max_pending=1024):
+        self.target = target
+        self.args = args
+        self.timeout = timeout or None
+        self.returncode = None
+        self.cancelled = False
+        self.timed_out = False
+        self.events = queue.Queue(maxsize=max_pending)
+        self._stop_event = threading.Event()
+        self._timer = None
+
+    def start(self):
+        if self.timeout:
+            self._timer = threading.Timer(self.timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        returncode = 0
+        try:
+            result = self.target(self, *self.args)
+            if isinstance(result, int):
+                returncode = result
+        except Exception as e:
+            self.events.put(("stderr", f"\n{type(e).__name__}: {e}\n"))
+            returncode = 1
+        finally:
+            if self._timer is not None:
+                self._timer.cancel()
+        self.returncode = returncode
+        self.events.put(("exit", returncode))
+
+    def _expire(self):
+        self.timed_out = True
+        self._stop_event.set()
+        self.events.put(("timeout", self.timeout))
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def write(self, text, tag=None):
+        # Blocks while the UI is behind, so a fast producer can't queue unbounded output
+        while True:
+            try:
+                self.events.put(("write", (text, tag)), timeout=0.1)
+                return
+            except queue.Full:
+                if self.stopped:
+                    return
+
+    def cancel(self):
+        if self.returncode is not None:
+            return False
+        self.cancelled = True
+        self._stop_event.set()
+        return True
+
+    def running(self):
+        return self.returncode is None
+
+
+def pty_supported():
+    try:
+        import pty  # noqa: F401  (POSIX only)
+        import termios  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PtyRunner(EventSource):
+    # Runs a program on a pseudo-terminal so full-screen and colour-aware tools behave as they do
+    # in a real terminal. The reader thread parses output straight into `screen` (a vtscreen.Screen)
+    # and queues at most one ("screen", runner) event until the frontend has looked at it, so a
+    # flood of output costs parsing time only, never one event per chunk. POSIX only; see
+    # pty_supported().
+    def __init__(self, argv, cwd=None, rows=24, cols=80, encoding=None, kill_grace=2.0, max_scrolled=5000):
+        from vtscreen import Screen
+        self.argv = argv
+        self.cwd = cwd
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.kill_grace = kill_grace
+        self.screen = Screen(rows, cols)
+        # Scrolled-off lines waiting for the frontend. With a view (which draws at a capped frame
+        # rate) older ones are dropped and counted; without one the reader waits instead.
+        self.max_scrolled = max_scrolled
+        self.dropped = 0
+        self.view = None
+        self.process = None
+        self.returncode = None
+        self.cancelled = False
+        self.timed_out = False
+        self.finished = False
+        self.events = queue.Queue(maxsize=16)
+        self._master = None
+        self._notified = threading.Event()
+        self._printed = False
+        self._reader = None
+
+    def start(self):
+        import fcntl
+        import pty
+        import termios
+        master, slave = pty.openpty()
+        self._set_size(slave, self.screen.rows, self.screen.cols)
+        env = dict(os.environ, TERM="xterm-256color", COLUMNS=str(self.screen.cols), LINES=str(self.screen.rows))
+
+        def make_controlling_terminal():
+            fcntl.ioctl(0, termios.TIOCSCTTY, 0)  # Runs in the child after setsid()
+
+        try:
+            self.process = subprocess.Popen(self.argv, cwd=self.cwd, env=env, stdin=slave, stdout=slave, stderr=slave,
+                                            start_new_session=True, preexec_fn=make_controlling_terminal)
+        except BaseException:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        self._master = master
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+        threading.Thread(target=self._wait, daemon=True).start()
+        return self
+
+    @staticmethod
+    def _set_size(fd, rows, cols):
+        import fcntl
+        import struct
+        import termios
+        fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
+
+    def _read(self):
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        screen = self.screen
+        while True:
+            try:
+                chunk = os.read(self._master, 65536)
+            except OSError:
+                break  # EIO once the program and everything it started have closed the terminal
+            if not chunk:
+                break
+            text = decoder.decode(chunk)
+            with screen.lock:
+                screen.feed(text)
+                replies, screen.replies = screen.replies, []
+                backlog = len(screen.scrolled) - self.max_scrolled
+                if backlog > 0 and self.view is not None:
+                    for _ in range(backlog):
+                        screen.scrolled.popleft()
+                    self.dropped += backlog
+            if replies:
+                self.write("".join(replies))
+            self._notify()
+            while backlog > 0 and self.view is None and not self.cancelled:
+                time.sleep(0.005)  # Nothing may be dropped when output is printed line by line
+                with screen.lock:
+                    backlog = len(screen.scrolled) - self.max_scrolled
+
+    def _notify(self):
+        if not self._notified.is_set():
+            self._notified.set()
+            self.events.put(("screen", self))
+
+    def screen_seen(self):
+        # Called by the frontend before it reads the screen; the next change queues a new event
+        self._notified.clear()
+
+    def take_text(self):
+        # Lines that scrolled by, then once the program is done the rest of its screen
+        with self.screen.lock:
+            final = self.finished and not self._printed
+            self._printed = self._printed or final
+            return self.screen.take_text(final)
+
+    def _wait(self):
+        self.process.wait()
+        self._reader.join(timeout=1.0)  # Background children can keep the terminal open
+        self.returncode = self.process.returncode
+        self.finished = True
+        self.events.put(("screen", self))
+        self.events.put(("exit", self.returncode))
+        master, self._master = self._master, None
+        os.close(master)
+
+    def write(self, text):
+        # Keystrokes and query replies for the program
+        master = self._master
+        if master is None:
+            return
+        try:
+            os.write(master, text.encode(self.encoding, "replace"))
+        except OSError:
+            pass  # Already gone
+
+    def resize(self, rows, cols):
+        with self.screen.lock:
+            self.screen.resize(rows, cols)
+        if self._master is not None:
+            try:
+                self._set_size(self._master, rows, cols)  # The kernel sends the program SIGWINCH
+            except OSError:
+                pass
+
+    def _stop(self):
+        import signal
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout=self.kill_grace)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def cancel(self):
+        if self.process is None or self.process.poll() is not None:
+            return False
+        self.cancelled = True
+        threading.Thread(target=self._stop, daemon=True).start()
+        return True
+
+    def running(self):
+        return self.process is not None and self.returncode is None
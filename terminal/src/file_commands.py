@@ -0,0 +1,149 @@
+import os
+
+from commands import parse_options
+from config import settings
+from diffengine import diff_task
+from listing import SORT_KEYS, dir_task
+from viewer import detect_format
+
+
+def dir_command(term, args):
+    # dir [path] [--depth N] [--include GLOB] [--exclude GLOB] [--sort name|size|mtime|none] [--reverse] [--dirs]
+    try:
+        positional, options = parse_options(args, value_options=("depth", "include", "exclude", "sort"),
+                                            flag_options=("reverse", "dirs"))
+        root = os.path.join(term.current_directory, positional[0]) if positional else term.current_directory
+        max_depth = int(options["depth"][-1]) if "depth" in options else settings['dir_max_depth']
+        sort = options.get("sort", [settings['dir_sort']])[-1]
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort order: {sort}. Use one of: {', '.join(SORT_KEYS)}")
+    except ValueError as e:
+        term.output.write(f"\nError listing directory contents: {str(e)}\n")
+        return 1
+    if not os.path.isdir(root):
+        term.output.write(f"\nDirectory not found: {root}. Please check the path and try again.\n")
+        return 1
+    include = options.get("include", [])
+    exclude = settings['dir_exclude'] + options.get("exclude", [])
+    try:
+        term.run_task(dir_task, root, max_depth, include, exclude, sort, "reverse" in options, "dirs" in options,
+                      settings['dir_page_size'], header="\n\n")
+    except Exception as e:
+        term.output.write(f"\nError listing directory contents: {str(e)}\n")
+        return 1
+
+
+def view_options(args):
+    # edit/openfile <file> [--line <n>] [--tail] [--hex] [--view]
+    positional, options = parse_options(args, value_options=("line",), flag_options=("tail", "hex", "view"))
+    if not positional:
+        raise ValueError("No file given")
+    line = int(options["line"][-1]) if "line" in options else None
+    return positional[0], line, options
+
+
+def needs_viewer(file_path, line, options):
+    # Big or binary files go to the paged viewer instead of being read into the scrollback
+    if line or options:
+        return True
+    if os.path.getsize(file_path) > settings['viewer_inline_limit']:
+        return True
+    with open(file_path, 'rb') as file:
+        kind, _ = detect_format(file.read(8192))
+    return kind == "binary"
+
+
+def edit_command(term, args):
+    try:
+        name, line, options = view_options(args)
+    except ValueError as e:
+        term.output.write(f"\nError opening file: {str(e)}\n")
+        return 1
+    file_path = os.path.join(term.current_directory, name)
+    try:
+        if needs_viewer(file_path, line, options):
+            term.open_viewer(file_path, start_line=line, follow="tail" in options, hex_view="hex" in options)
+            term.output.write(f"\nOpened {file_path} in the viewer.\n")
+            return
+        with open(file_path, 'r') as file:
+            file_contents = file.read()
+        term.output.write(f"\n{file_contents}\n")
+    except FileNotFoundError:
+        term.output.write(f"\nFile not found: {file_path}. Please verify the file path and try again.\n")
+        return 1
+    except Exception as e:
+        term.output.write(f"\nError opening file: {str(e)}\n")
+        return 1
+
+
+def openfile_command(term, args):
+    try:
+        name, line, options = view_options(args)
+    except ValueError as e:
+        term.output.write(f"\nFailed to open file: {str(e)}. Please check the file and try again.\n")
+        return 1
+    file_path = os.path.join(term.current_directory, name)
+    try:
+        if needs_viewer(file_path, line, options):
+            term.open_viewer(file_path, start_line=line, follow="tail" in options, hex_view="hex" in options)
+            term.output.write(f"\nOpened {file_path} in the viewer.\n")
+            return
+        with open(file_path, 'r') as file:
+            file_content = file.read()
+        term.output.write(f"\nContents of {file_path}:\n{file_content}\n")
+    except FileNotFoundError:
+        term.output.write(f"\nFile not found: {file_path}. Please check the file path and try again.\n")
+        return 1
+    except Exception as e:
+        term.output.write(f"\nFailed to open file: {str(e)}. Please check the file and try again.\n")
+        return 1
+
+
+def mkdir_command(term, args):
+    new_dir = args[0]
+    try:
+        os.makedirs(os.path.join(term.current_directory, new_dir), exist_ok=True)
+        term.output.write(f"\nDirectory created: {new_dir}\n")
+    except Exception as e:
+        term.output.write(f"\nError creating directory: {str(e)}\n")
+        return 1
+
+
+def rename_command(term, args):
+    old_file_path = os.path.join(term.current_directory, args[0])
+    new_file_path = os.path.join(term.current_directory, args[1])
+    try:
+        os.rename(old_file_path, new_file_path)
+        term.output.write(f"\nFile renamed from {args[0]} to {args[1]}\n")
+    except FileNotFoundError:
+        term.output.write(f"\nFile not found: {old_file_path}. Please verify the file path and try again.\n")
+        return 1
+    except Exception as e:
+        term.output.write(f"\nError renaming file: {str(e)}\n")
+        return 1
+
+
+def diff_command(term, args):
+    # diff <file1> <file2> [--context N] [--ignore-whitespace] [--side-by-side]
+    try:
+        positional, options = parse_options(args, value_options=("context",), flag_options=("ignore-whitespace", "side-by-side"))
+        if len(positional) != 2:
+            raise ValueError("Expected exactly two files")
+        context = int(options["context"][-1]) if "context" in options else settings['diff_context']
+        if context < 0:
+            raise ValueError("Context must not be negative")
+    except ValueError as e:
+        term.output.write(f"\nFailed to compare files: {str(e)}.\n")
+        return 1
+    file1_path = os.path.join(term.current_directory, positional[0])
+    file2_path = os.path.join(term.current_directory, positional[1])
+    for path in (file1_path, file2_path):
+        if not os.path.isfile(path):
+            term.output.write(f"\nFile not found: {path}. Please check the file paths and try again.\n")
+            return 1
+    try:
+        term.run_task(diff_task, file1_path, file2_path, context, "ignore-whitespace" in options, "side-by-side" in options,
+                      settings['diff_width'], settings['diff_max_cost'])
+    except Exception as e:
+        term.output.write(f"\nFailed to compare files: {str(e)}.\n")
+        return 1
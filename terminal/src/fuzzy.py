@@ -0,0 +1,103 @@
+import heapq
+from collections import defaultdict
+
+
+def trigrams(word):
+    padded = f"^^{word.lower()}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    # Optimal string alignment distance (insert/delete/substitute/transpose), or limit + 1 once
+    # the distance is known to exceed limit. Only the diagonal band |i - j| <= limit is computed.
+    n, m = len(a), len(b)
+    if abs(n - m) > limit:
+        return limit + 1
+    big = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else big for j in range(m + 1)]
+    for i in range(1, n + 1):
+        current = [big] * (m + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        ai = a[i - 1]
+        for j in range(max(1, i - limit), min(m, i + limit) + 1):
+            value = previous[j - 1] + (ai != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if previous2 is not None and j > 1 and ai == b[j - 2] and a[i - 2] == b[j - 1] and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value if value < big else big
+            if value < best:
+                best = value
+        if best > limit:
+            return big
+        previous2, previous = previous, current
+    return min(previous[m], big)
+
+
+class FuzzyIndex:
+    # Trigram index over a fixed set of words. A query only scores the words that share the most
+    # trigrams with it, so lookups cost roughly the size of a few posting lists instead of
+    # one full string comparison per word.
+    def __init__(self, words, max_candidates=16, common_gram_ratio=0.01):
+        self.words = list(dict.fromkeys(words))
+        self.lowered = [word.lower() for word in self.words]
+        self.max_candidates = max_candidates
+        self.postings = defaultdict(list)
+        for word_id, word in enumerate(self.words):
+            for gram in trigrams(word):
+                self.postings[gram].append(word_id)
+        # Grams shared by many words (".tx", "txt", common stems) say little about a match but
+        # dominate the counting cost, so they are only looked up in the words the rarer ones found
+        self.common_gram_limit = max(256, int(len(self.words) * common_gram_ratio))
+
+    def __len__(self):
+        return len(self.words)
+
+    def candidates(self, query):
+        if len(self.words) <= self.max_candidates:
+            return range(len(self.words))  # Tiny index (e.g. command names): just check everything
+        counts = defaultdict(int)
+        grams = sorted((gram for gram in trigrams(query) if gram in self.postings), key=lambda gram: len(self.postings[gram]))
+        for n, gram in enumerate(grams):  # Rarest first
+            posting = self.postings[gram]
+            if counts and len(posting) > self.common_gram_limit:
+                # The rest are common: rather than walk their postings, look for them in the words
+                # found so far, so a typo that broke the rare grams still ranks the right word first
+                if len(counts) <= 4 * self.common_gram_limit:
+                    common = grams[n:]
+                    for word_id in counts:
+                        padded = f"^^{self.lowered[word_id]}$"
+                        counts[word_id] += sum(gram in padded for gram in common)
+                break
+            for word_id in posting:
+                counts[word_id] += 1
+        if len(counts) > 4 * self.common_gram_limit:
+            return heapq.nlargest(self.max_candidates, counts, key=counts.__getitem__)
+        # Equal counts go to the words closest in length, which the edit distance favours too
+        size = len(query)
+        return heapq.nlargest(self.max_candidates, counts, key=lambda word_id: (counts[word_id], -abs(len(self.lowered[word_id]) - size)))
+
+    def search(self, query, k=3, cutoff=0.7):
+        # Returns up to k (score, word) pairs with score >= cutoff, best first
+        query_lower = query.lower()
+        results = []
+        for word_id in self.candidates(query):
+            word = self.words[word_id]
+            longest = max(len(query), len(word)) or 1
+            # Once k results are in hand, only a word that beats the worst of them is worth finishing
+            floor = results[-1][0] if len(results) >= k else cutoff
+            limit = int((1.0 - floor) * longest + 1e-9)
+            distance = edit_distance(query_lower, self.lowered[word_id], limit)
+            if distance > limit:
+                continue
+            score = 1.0 - distance / longest
+            if score >= cutoff:
+                results.append((score, word))
+                results.sort(key=lambda item: (-item[0], item[1]))
+                del results[k:]
+        return results
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from config import settings
+from lineindex import LineIndex
+from session import Session
+
+
+class StreamOutput:
+    # Output sink for running without a window: plain text on a stream, or with json_lines one
+    # JSON object per line for every write and session event. What was written is also kept in a
+    # LineIndex (line numbers count from the start of the run) so filter works here too.
+    def __init__(self, stream, json_lines=False):
+        self.stream = stream
+        self.json_lines = json_lines
+        self.index = LineIndex()
+
+    def write(self, text, tag=None):
+        if not text:
+            return
+        self.index.append_text(text)
+        excess = len(self.index) - settings['scrollback_lines']
+        if settings['scrollback_lines'] and excess >= settings['scrollback_trim_batch']:
+            self.index.trim(excess, renumber=False)
+        if self.json_lines:
+            self.record({"event": "output", "text": text, "tag": tag})
+        else:
+            self.stream.write(text)
+
+    def clear(self):
+        self.index.trim(len(self.index), renumber=False)
+        if self.json_lines:
+            self.record({"event": "clear"})
+
+    def on_event(self, kind, data):
+        if self.json_lines:
+            self.record({"event": kind, **data})
+
+    def record(self, event):
+        self.stream.write(json.dumps(event) + "\n")
+
+
+def read_script(path):
+    # One command per line; blank lines and lines starting with # are skipped
+    with (sys.stdin if path == "-" else open(path, "r")) as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def run_lines(session, lines, stop_on_error=False, echo=False):
+    # Runs each line to completion before the next one; returns the number of failed commands
+    failures = []
+
+    def record_failure(kind, data):
+        if kind in ("exit", "job") and data["code"] and data.get("state") != "cancelled":
+            failures.append(data)
+
+    session.listeners.append(record_failure)
+    for line in lines:
+        if echo:
+            session.output.write(f"{session.current_directory}> {line}\n", "bold")
+        try:
+            session.run(line)
+            while not session.pump(wait=0.05):
+                session.jobs.pump()
+            session.jobs.pump()
+        except KeyboardInterrupt:
+            session.cancel()
+            while not session.pump(wait=0.05):
+                pass
+            break
+        if failures and stop_on_error:
+            break
+    finish_jobs(session)
+    return len(failures)
+
+
+def finish_jobs(session):
+    # Wait for background jobs, then print each one's output as if it had been brought back with fg
+    try:
+        while session.jobs.pump():
+            time.sleep(0.02)
+    except KeyboardInterrupt:
+        for job in list(session.jobs.jobs.values()):
+            session.jobs.kill(job)
+        while session.jobs.pump():
+            time.sleep(0.02)
+    for job in list(session.jobs.jobs.values()):
+        session.jobs.foreground(job)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Nebula Terminal commands without a window.")
+    parser.add_argument("script", nargs="?", help="file with one command per line, or - for stdin")
+    parser.add_argument("-c", "--command", action="append", default=[], help="command to run (repeatable, runs before the script)")
+    parser.add_argument("--cwd", help="starting directory (default: the current directory)")
+    parser.add_argument("--json", action="store_true", help="print JSON lines with tagged output and command events")
+    parser.add_argument("--echo", action="store_true", help="print each command before its output")
+    parser.add_argument("--stop-on-error", action="store_true", help="stop at the first command that fails")
+    args = parser.parse_args(argv)
+    if not args.command and not args.script:
+        parser.error("nothing to run: give a script file or -c <command>")
+
+    output = StreamOutput(sys.stdout, json_lines=args.json)
+    session = Session(output, current_directory=os.path.abspath(args.cwd or os.getcwd()))
+    session.listeners.append(output.on_event)
+    session.scrollback = output.index
+    lines = list(args.command)
+    try:
+        if args.script:
+            lines.extend(read_script(args.script))
+    except OSError as e:
+        print(f"Cannot read script: {e}", file=sys.stderr)
+        return 2
+    failures = run_lines(session, lines, args.stop_on_error, args.echo)
+    if not args.json:
+        sys.stdout.write("\n")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+import re
+
+from config import settings
+from themes import galaxy_themes
+
+# ANSI colours 0-15: SGR 30-37 / 40-47, then the bright 90-97 / 100-107
+ANSI_COLORS = ["000000", "cd3131", "0dbc79", "e5e510", "2472c8", "bc3fbc", "11a8cd", "e5e5e5",
+               "666666", "f14c4c", "23d18b", "f5f543", "3b8eea", "d670d6", "29b8db", "ffffff"]
+# CSI sequences (SGR is the one ending in "m"), OSC strings (window titles) and two-character escapes
+ESCAPE = re.compile(r"\x1b\[(?P<params>[0-?]*)[ -/]*(?P<final>[@-~])|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\^_]")
+# The start of a CSI sequence or OSC string at the end of a read, which the next read may complete
+PARTIAL = re.compile(r"\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?)?\Z")
+MAX_CARRY = 256  # A partial sequence longer than this is shown as text
+TOKENS = re.compile(
+    r"(?P<url>\b(?:https?|ftp)://[^\s<>\"'`]*[^\s<>\"'`.,;:!?)\]}])"
+    r"|(?P<path>(?:\b[A-Za-z]:[\\/]|(?<![\w/.~-])(?:~|\.{1,2})?/)[^\s<>\"'`|*?]*[^\s<>\"'`|*?.,;:!?)\]}])"
+    r"|(?P<error>\b(?:errors?|failed|failure|fatal|denied|exception|traceback|not found|not recognized)\b)"
+    r"|(?P<number>(?<![\w.#-])\d+(?:\.\d+)?(?:%|[kKMGT]i?B\b|ms\b|s\b)?(?![\w.]))",
+    re.IGNORECASE)
+HIGHLIGHT_TAGS = ("hl-url", "hl-path", "hl-error", "hl-number")
+MAX_LINE_CHARS = 10000  # Only the start of very long lines is tokenized
+
+
+def xterm_color(n):
+    # Hex colour of entry n of the xterm 256-colour palette
+    if n < 16:
+        return ANSI_COLORS[n]
+    if n < 232:
+        levels = (0, 95, 135, 175, 215, 255)
+        n -= 16
+        return f"{levels[n // 36]:02x}{levels[n // 6 % 6]:02x}{levels[n % 6]:02x}"
+    grey = 8 + 10 * (n - 232)
+    return f"{grey:02x}{grey:02x}{grey:02x}"
+
+
+class AnsiDecoder:
+    # Splits text containing ANSI escape sequences into (text, tags) pieces. The colour state
+    # carries over between calls, and so does a sequence cut in half by a read boundary.
+    def __init__(self):
+        self.carry = ""
+        self.reset()
+
+    def reset(self):
+        self.fg = None
+        self.bg = None
+        self.bold = False
+        self.underline = False
+
+    def active(self):
+        return bool(self.carry or self.fg or self.bg or self.bold or self.underline)
+
+    def tags(self):
+        tags = []
+        if self.fg:
+            tags.append(f"ansi-fg-{self.fg}")
+        if self.bg:
+            tags.append(f"ansi-bg-{self.bg}")
+        if self.bold:
+            tags.append("ansi-bold")
+        if self.underline:
+            tags.append("ansi-underline")
+        return tuple(tags)
+
+    def feed(self, text):
+        text = self.carry + text
+        self.carry = ""
+        pieces = []
+        position = 0
+        for match in ESCAPE.finditer(text):
+            if match.start() > position:
+                pieces.append((text[position:match.start()].replace("\x1b", ""), self.tags()))
+            if match.group("final") == "m":
+                self.apply(match.group("params"))
+            position = match.end()
+        rest = text[position:]
+        partial = PARTIAL.search(rest, max(0, len(rest) - MAX_CARRY))
+        if partial:
+            self.carry = rest[partial.start():]
+            rest = rest[:partial.start()]
+        if rest:
+            pieces.append((rest.replace("\x1b", ""), self.tags()))
+        return pieces
+
+    def finish(self):
+        # End of the stream: a sequence that was never completed is shown as text after all
+        text = self.carry.replace("\x1b", "")
+        self.carry = ""
+        return [(text, self.tags())] if text else []
+
+    def apply(self, params):
+        codes = [int(code) if code.isdigit() else 0 for code in params.replace(":", ";").split(";")] if params else [0]
+        i = 0
+        while i < len(codes):
+            code = codes[i]
+            if code == 0:
+                self.reset()
+            elif code == 1:
+                self.bold = True
+            elif code == 22:
+                self.bold = False
+            elif code == 4:
+                self.underline = True
+            elif code == 24:
+                self.underline = False
+            elif 30 <= code <= 37 or 90 <= code <= 97:
+                self.fg = ANSI_COLORS[code - 30 if code < 90 else code - 82]
+            elif 40 <= code <= 47 or 100 <= code <= 107:
+                self.bg = ANSI_COLORS[code - 40 if code < 100 else code - 92]
+            elif code == 39:
+                self.fg = None
+            elif code == 49:
+                self.bg = None
+            elif code in (38, 48) and i + 1 < len(codes):
+                color = None
+                if codes[i + 1] == 5 and i + 2 < len(codes):
+                    color = xterm_color(min(255, codes[i + 2]))
+                    i += 2
+                elif codes[i + 1] == 2 and i + 4 < len(codes):
+                    color = "".join(f"{min(255, value):02x}" for value in codes[i + 2:i + 5])
+                    i += 4
+                if code == 38:
+                    self.fg = color
+                else:
+                    self.bg = color
+            i += 1
+
+
+class AnsiOutput:
+    # Output sink wrapper that turns ANSI colour codes from child processes into Text tags.
+    # Text without an escape character goes straight through.
+    def __init__(self, inner, highlighter):
+        self.inner = inner
+        self.highlighter = highlighter
+        self.decoder = AnsiDecoder()
+
+    def write(self, text, tag=None):
+        if "\x1b" not in text and not self.decoder.active():
+            self.inner.write(text, tag)
+            return
+        self._write_pieces(self.decoder.feed(text), (tag,) if isinstance(tag, str) else tuple(tag or ()))
+
+    def _write_pieces(self, pieces, base=()):
+        for piece, ansi_tags in pieces:
+            self.highlighter.configure_ansi(ansi_tags)
+            self.inner.write(piece, base + ansi_tags)
+
+    def reset(self):
+        # Called between commands so one program's unterminated colour doesn't leak into the next.
+        # Whatever the last program left in the carry is its output, not the start of a sequence.
+        self._write_pieces(self.decoder.finish())
+        self.decoder = AnsiDecoder()
+
+    def clear(self):
+        self.reset()
+        self.inner.clear()
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def _luminance(color):
+    color = color.lstrip("#")
+    r, g, b = (int(color[i:i + 2], 16) for i in (0, 2, 4))
+    return (0.2126 * r + 0.7152 * g + 0.0722 * b) / 255
+
+
+def palette():
+    # Highlight colours from settings; a light enough galaxy theme colour is used for paths
+    colors = dict(settings['highlight_colors'])
+    for theme_id, _, color in galaxy_themes:
+        if theme_id == settings['theme'] and _luminance(color) > 0.2:
+            colors['path'] = color
+    return colors
+
+
+class Highlighter:
+    # Tags URLs, paths, error words and numbers in the terminal output. It is told which lines
+    # each flush appended (see OutputBuffer.observers) and keeps a list of line ranges not yet
+    # highlighted. Each pass tokenizes at most lines_per_pass of them, visible lines first, then
+    # the newest, and adds every tag's ranges in one call. Nothing is ever rescanned.
+    def __init__(self, widget, frame_ms=16):
+        self.widget = widget
+        self.frame_ms = frame_ms
+        self.pending = []  # Sorted, non-overlapping [first, last] line ranges
+        self._job = None
+        self._ansi_tags = set()
+        self.enabled = True
+        self.lines_per_pass = 500
+        self.apply_settings()
+        widget.configure(yscrollcommand=self.on_view_change)
+
+    def apply_settings(self):
+        colors = palette()
+        for name in ("url", "path", "error", "number"):
+            self.widget.tag_configure(f"hl-{name}", foreground=colors[name])
+        self.widget.tag_configure("hl-url", underline=True)
+        for tag in HIGHLIGHT_TAGS:
+            self.widget.tag_lower(tag)  # Tags a command chose itself (error, success, ANSI) take priority
+        self.lines_per_pass = max(10, int(settings['highlight_lines_per_pass']))
+        enabled = bool(settings['highlight'])
+        if self.enabled and not enabled:
+            self.pending = []
+            for tag in HIGHLIGHT_TAGS:
+                self.widget.tag_remove(tag, "1.0", "end")
+        self.enabled = enabled
+
+    def configure_ansi(self, tags):
+        for tag in tags:
+            if tag in self._ansi_tags:
+                continue
+            self._ansi_tags.add(tag)
+            if tag.startswith("ansi-fg-"):
+                self.widget.tag_configure(tag, foreground="#" + tag[8:])
+            elif tag.startswith("ansi-bg-"):
+                self.widget.tag_configure(tag, background="#" + tag[8:])
+            elif tag == "ansi-bold":
+                self.widget.tag_configure(tag, font=self.widget.tag_cget("bold", "font") or None)
+            elif tag == "ansi-underline":
+                self.widget.tag_configure(tag, underline=True)
+
+    # OutputBuffer observer interface
+    def output_inserted(self, first_line):
+        if not self.enabled:
+            return
+        last_line = int(self.widget.index("end-1c").split(".")[0])
+        if self.pending and self.pending[-1][1] >= first_line - 1:
+            self.pending[-1][1] = max(self.pending[-1][1], last_line)
+        else:
+            self.pending.append([first_line, last_line])
+        self.schedule()
+
+    def output_trimmed(self, lines):
+        shifted = []
+        for first, last in self.pending:
+            first, last = max(1, first - lines), last - lines
+            if last >= first:
+                shifted.append([first, last])
+        self.pending = shifted
+
+    def output_cleared(self):
+        self.pending = []
+
+    def on_view_change(self, first, last):
+        if self.pending:
+            self.schedule()  # Scrolled to lines that may still be waiting
+
+    def schedule(self):
+        if self._job is None and self.pending:
+            self._job = self.widget.after(self.frame_ms, self.run_pass)
+
+    def run_pass(self):
+        self._job = None
+        budget = self.lines_per_pass
+        top = int(self.widget.index("@0,0").split(".")[0])
+        bottom = int(self.widget.index(f"@0,{self.widget.winfo_height()}").split(".")[0])
+        budget -= self.highlight_lines(top, min(bottom, top + budget - 1))
+        while budget > 0 and self.pending:
+            first, last = self.pending[-1]
+            budget -= self.highlight_lines(max(first, last - budget + 1), last)
+        self.schedule()
+
+    def take(self, first, last):
+        # Remove [first, last] from the pending ranges; returns the parts that were pending
+        taken = []
+        remaining = []
+        for start, end in self.pending:
+            if end < first or start > last:
+                remaining.append([start, end])
+                continue
+            taken.append((max(start, first), min(end, last)))
+            if start < first:
+                remaining.append([start, first - 1])
+            if end > last:
+                remaining.append([last + 1, end])
+        self.pending = remaining
+        return taken
+
+    def highlight_lines(self, first, last):
+        # Tokenize the pending lines between first and last; returns how many lines were done
+        done = 0
+        for start, end in self.take(first, last):
+            text = self.widget.get(f"{start}.0", f"{end}.0 lineend")
+            ranges = {tag: [] for tag in HIGHLIGHT_TAGS}
+            for number, line in enumerate(text.split("\n"), start):
+                if not line:
+                    continue
+                for match in TOKENS.finditer(line, 0, MAX_LINE_CHARS):
+                    ranges["hl-" + match.lastgroup].extend((f"{number}.{match.start()}", f"{number}.{match.end()}"))
+            for tag, indexes in ranges.items():
+                self.widget.tag_remove(tag, f"{start}.0", f"{end}.0 lineend")  # The line may have grown since
+                if indexes:
+                    self.widget.tag_add(tag, *indexes)
+            done += end - start + 1
+        return done
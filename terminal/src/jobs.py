@@ -0,0 +1,235 @@
+import time
+from collections import OrderedDict, deque
+
+
+def deliver_event(output, kind, data):
+    # Write one ProcessRunner/BackgroundTask event to an output sink; returns True for "exit"
+    if kind == "stdout":
+        output.write(data)
+    elif kind == "write":
+        output.write(*data)
+    elif kind == "stderr":
+        output.write(data, "error")
+    elif kind == "timeout":
+        output.write(f"\nCommand timed out after {data} seconds.\n", "error")
+    elif kind == "screen":
+        # PtyRunner: a frontend view draws the screen itself; otherwise print what scrolled by
+        data.screen_seen()
+        if data.view is not None:
+            data.view.update()
+        else:
+            for text, tags in data.take_text():
+                output.write(text, tags)
+    elif kind == "exit":
+        return True
+    return False
+
+
+class JobOutput:
+    # Output of one background job, kept out of the scrollback until `fg`. Only the last
+    # max_chars characters are kept. Once attached, writes pass straight to the target.
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.pieces = deque()
+        self.chars = 0
+        self.lines = 0  # Newlines in what is buffered, for the jobs listing
+        self.dropped = 0
+        self.target = None
+
+    def write(self, text, tag=None):
+        if not text:
+            return
+        if self.target is not None:
+            self.target.write(text, tag)
+            return
+        self.pieces.append((text, tag))
+        self.chars += len(text)
+        self.lines += text.count("\n")
+        while self.chars > self.max_chars and len(self.pieces) > 1:
+            old, _ = self.pieces.popleft()
+            self.chars -= len(old)
+            self.lines -= old.count("\n")
+            self.dropped += len(old)
+
+    def clear(self):
+        self.pieces.clear()
+        self.chars = 0
+        self.lines = 0
+
+    def attach(self, target):
+        # Replay what was buffered into target and send everything after it there too
+        if self.dropped:
+            target.write(f"... {self.dropped} earlier characters were dropped\n", "bold")
+        while self.pieces:
+            target.write(*self.pieces.popleft())
+        self.chars = 0
+        self.lines = 0
+        self.target = target
+
+
+class Job:
+    def __init__(self, job_id, line, max_chars):
+        self.id = job_id
+        self.line = line
+        self.state = "queued"  # queued -> running -> done / cancelled
+        self.output = JobOutput(max_chars)
+        self.task = None
+        self.on_exit = None
+        self.returncode = None
+        self.created = time.perf_counter()
+        self.started = None
+        self.finished = None
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+
+class JobContext:
+    # What a command gets as `term` when it runs as a job: its own output buffer, and a
+    # follow_task that gives the task to the job instead of making it the foreground command
+    def __init__(self, session, job):
+        self.session = session
+        self.job = job
+        self.output = job.output
+        self.current_directory = session.current_directory
+
+    def follow_task(self, task, header=None, on_exit=None):
+        self.job.task = task
+        self.job.on_exit = on_exit
+        if header:
+            self.output.write(header)
+
+    def run_external(self, argv, header=None, on_exit=None):
+        self.follow_task(self.session.start_external(argv, self.current_directory), header, on_exit)
+
+    def run_task(self, target, *args, header=None, on_exit=None, timeout=0):
+        self.follow_task(self.session.start_task(target, *args, timeout=timeout), header, on_exit)
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+class JobManager:
+    # Background jobs started with a trailing "&". At most max_running run at once; the rest wait
+    # in order. The frontend calls pump() to move job output into the job buffers.
+    def __init__(self, session, max_running=4, buffer_chars=1000000, keep_finished=20):
+        self.session = session
+        self.max_running = max_running
+        self.buffer_chars = buffer_chars
+        self.keep_finished = keep_finished
+        self.jobs = OrderedDict()
+        self.next_id = 1
+        self.notices = []  # "[1] Done  dir" lines for the frontend to show before its next prompt
+
+    def submit(self, line):
+        job = Job(self.next_id, line, self.buffer_chars)
+        self.next_id += 1
+        self.jobs[job.id] = job
+        self.start_waiting()
+        return job
+
+    def active(self):
+        return any(job.state in ("queued", "running") for job in self.jobs.values())
+
+    def find(self, spec=None):
+        # Job by number ("2" or "%2"); the most recent job without one
+        if spec is None:
+            return next(reversed(self.jobs.values()), None)
+        try:
+            return self.jobs.get(int(spec.lstrip("%")))
+        except ValueError:
+            return None
+
+    def start_waiting(self):
+        running = sum(1 for job in self.jobs.values() if job.state == "running")
+        for job in list(self.jobs.values()):
+            if running >= self.max_running:
+                break
+            if job.state == "queued":
+                self.start(job)
+                running += job.state == "running"
+
+    def start(self, job):
+        from commands import registry
+        job.state = "running"
+        job.started = time.perf_counter()
+        parts = job.line.split()
+        context = JobContext(self.session, job)
+        command = registry.get(parts[0])
+        try:
+            if command is not None:
+                code = command(context, parts[1:]) or 0
+            else:
+                # A program: plain pipes rather than a pseudo-terminal, since nothing shows its screen
+                argv = self.session.find_program(parts[0], parts[1:])
+                if argv is None:
+                    job.output.write(f"\nCommand '{parts[0]}' not recognized.\n", "error")
+                    code = 127
+                else:
+                    context.run_external(argv, header="\n")
+                    code = 0
+        except Exception as e:
+            job.output.write(f"\n{type(e).__name__}: {e}\n", "error")
+            self.finish(job, 1)
+            return
+        if job.task is None:
+            self.finish(job, code)  # Finished while starting; its output is already buffered
+
+    def pump(self, limit=256):
+        # Returns True while any job is still queued or running
+        for job in list(self.jobs.values()):
+            if job.state != "running" or job.task is None:
+                continue
+            for kind, data in job.task.read_events(limit):
+                if deliver_event(job.output, kind, data):
+                    if job.task.cancelled:
+                        self.finish(job, job.task.returncode, cancelled=True)
+                    else:
+                        if job.on_exit is not None:
+                            job.on_exit(job.task.returncode)
+                        self.finish(job, job.task.returncode)
+                    break
+        self.start_waiting()
+        return self.active()
+
+    def finish(self, job, code, cancelled=False):
+        job.state = "cancelled" if cancelled else "done"
+        job.returncode = code
+        job.finished = time.perf_counter()
+        status = "Killed" if cancelled else ("Done" if not code else f"Exit {code}")
+        self.notices.append(f"[{job.id}] {status}  {job.line}")
+        self.session.emit("job", {"id": job.id, "line": job.line, "state": job.state, "code": code})
+        finished = [old for old in self.jobs.values() if old.state in ("done", "cancelled")]
+        for old in finished[:-self.keep_finished]:  # Forget the oldest finished jobs nobody brought back
+            del self.jobs[old.id]
+
+    def take_notices(self):
+        notices, self.notices = self.notices, []
+        return notices
+
+    def foreground(self, job):
+        # fg: replay the job's output; a running job becomes the foreground command
+        session = self.session
+        del self.jobs[job.id]
+        session.output.write(f"\n[{job.id}] {job.line}\n", "bold")
+        if job.state == "queued":
+            parts = job.line.split()
+            session.execute(parts[0], parts[1:])
+            return
+        job.output.attach(session.output)
+        if job.state == "running" and job.task is not None:
+            session.follow_task(job.task, on_exit=job.on_exit)
+        else:
+            status = "Killed" if job.state == "cancelled" else ("Done" if not job.returncode else f"Exit {job.returncode}")
+            session.output.write(f"\n[{job.id}] {status}\n", "bold")
+            self.notices = [notice for notice in self.notices if not notice.startswith(f"[{job.id}] ")]
+
+    def kill(self, job):
+        if job.state == "queued":
+            self.finish(job, None, cancelled=True)
+            return True
+        if job.state == "running" and job.task is not None:
+            return job.task.cancel()
+        return False
@@ -0,0 +1,161 @@
+import bisect
+import re
+
+BLOCK_LINES = 4096
+
+
+class LineIndex:
+    # The scrollback as a list of lines, kept in blocks. Each block's lines are joined into one
+    # string (with the line start offsets) the first time it is searched, so a query is one regex
+    # pass over a few big strings instead of a Python loop over every line. Appending only touches
+    # the last block; trimming drops whole blocks from the front.
+    def __init__(self):
+        self.blocks = [[]]
+        self._joined = [None]  # Per block: [text, line start offsets, lowercased text], or None until searched
+        self.first_line = 1  # Line number of the first indexed line
+        self.trimmed = 0  # Lines trimmed from the front so far, to follow a line across trims
+        self.version = 0  # Bumped on every change
+
+    def __len__(self):
+        return sum(len(block) for block in self.blocks)
+
+    def last_line(self):
+        return self.first_line + len(self) - 1
+
+    def replace_from(self, line_number, lines):
+        # Drop everything from line_number on and append lines in its place
+        keep = max(0, line_number - self.first_line)
+        for i, block in enumerate(self.blocks):
+            if keep <= len(block):
+                del block[keep:]
+                del self.blocks[i + 1:], self._joined[i + 1:]
+                self._joined[i] = None
+                break
+            keep -= len(block)
+        self.extend(lines)
+
+    def extend(self, lines):
+        last = len(self.blocks) - 1
+        self._joined[last] = None
+        position = 0
+        while position < len(lines):
+            block = self.blocks[-1]
+            room = BLOCK_LINES - len(block)
+            if room <= 0:
+                self.blocks.append([])
+                self._joined.append(None)
+                continue
+            block.extend(lines[position:position + room])
+            position += room
+        self.version += 1
+
+    def append_text(self, text):
+        # Add written text, which continues the last line until it has a newline
+        lines = text.split("\n")
+        block = self.blocks[-1]
+        if block:
+            block[-1] += lines.pop(0)
+            self._joined[-1] = None
+        self.extend(lines)
+
+    def trim(self, count, renumber=True):
+        # Remove the first count lines. With renumber the remaining lines start at 1 again (like
+        # the Text widget's line numbers); without it they keep their numbers.
+        count = min(count, len(self))
+        if count <= 0:
+            return
+        self.trimmed += count
+        if not renumber:
+            self.first_line += count
+        while count and self.blocks:
+            block = self.blocks[0]
+            if len(block) <= count and len(self.blocks) > 1:
+                count -= len(block)
+                del self.blocks[0], self._joined[0]
+            else:
+                del block[:count]
+                self._joined[0] = None
+                count = 0
+        self.version += 1
+
+    def clear(self):
+        self.trimmed += len(self)
+        self.blocks = [[]]
+        self._joined = [None]
+        self.first_line = 1
+        self.version += 1
+
+    def line(self, number):
+        offset = number - self.first_line
+        for block in self.blocks:
+            if 0 <= offset < len(block):
+                return block[offset]
+            offset -= len(block)
+        return None
+
+    def _block_text(self, i):
+        joined = self._joined[i]
+        if joined is None:
+            block = self.blocks[i]
+            starts = []
+            position = 0
+            for line in block:
+                starts.append(position)
+                position += len(line) + 1
+            joined = self._joined[i] = ["\n".join(block), starts, None]
+        return joined
+
+    def _lower_text(self, i):
+        # Lowercased block text for case-insensitive queries, which re.IGNORECASE makes ~10x slower.
+        # False when lowercasing changes the length (a few Unicode letters), so offsets would be off.
+        joined = self._block_text(i)
+        if joined[2] is None:
+            lower = joined[0].lower()
+            joined[2] = lower if len(lower) == len(joined[0]) else False
+        return joined[2]
+
+    def search(self, query, regex=False, ignore_case=None, limit=None):
+        # Returns [(line number, start column, end column)] in order. ignore_case defaults to
+        # smart case: case-insensitive unless the query has a capital letter. Bad regexes raise re.error.
+        if ignore_case is None:
+            ignore_case = query == query.lower()
+        source = query if regex else re.escape(query)
+        pattern = re.compile(source, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+        # A query without capitals finds the same matches in lowercased text without IGNORECASE
+        lowered = re.compile(source, re.MULTILINE) if ignore_case and query == query.lower() else None
+        matches = []
+        number = self.first_line
+        for i, block in enumerate(self.blocks):
+            text, starts, _ = self._block_text(i)
+            search = pattern
+            if lowered is not None and self._lower_text(i):
+                text, search = self._lower_text(i), lowered
+            for match in search.finditer(text):
+                if match.start() == match.end():
+                    continue  # Empty matches (e.g. "^") would match every line and show nothing
+                row = bisect.bisect_right(starts, match.start()) - 1
+                column = match.start() - starts[row]
+                matches.append((number + row, column, min(match.end() - starts[row], len(block[row]))))
+                if limit is not None and len(matches) >= limit:
+                    return matches
+            number += len(block)
+        return matches
+
+
+class WidgetLineIndex:
+    # OutputBuffer observer that keeps a LineIndex in step with the Text widget. New output is read
+    # back from the first inserted line, and the last indexed line is always re-read, since it may
+    # have been a prompt the user has typed on since.
+    def __init__(self, widget):
+        self.widget = widget
+        self.index = LineIndex()
+
+    def output_inserted(self, first_line):
+        start = max(1, min(first_line, self.index.last_line()))
+        self.index.replace_from(start, self.widget.get(f"{start}.0", "end-1c").split("\n"))
+
+    def output_trimmed(self, lines):
+        self.index.trim(lines)
+
+    def output_cleared(self):
+        self.index.clear()
@@ -0,0 +1,113 @@
+import fnmatch
+import os
+import time
+
+SORT_KEYS = ("name", "size", "mtime", "none")
+
+
+def _sort_key(sort):
+    if sort == "size":
+        return lambda entry: getattr(_stat(entry), "st_size", 0)
+    if sort == "mtime":
+        return lambda entry: getattr(_stat(entry), "st_mtime", 0)
+    return lambda entry: entry.name.lower()
+
+
+def _stat(entry):
+    try:
+        return entry.stat(follow_symlinks=False)
+    except OSError:
+        return None
+
+
+def _matches(name, patterns):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def walk(root, max_depth=None, exclude=(), sort="name", reverse=False, should_stop=None, on_error=None):
+    # Depth-first generator over os.scandir: yields (entry, depth) for every entry below root.
+    # Only one directory's entries are held at a time; excluded directories are never entered.
+    stack = [(root, 0)]
+    key = None if sort == "none" else _sort_key(sort)
+    while stack:
+        if should_stop is not None and should_stop():
+            return
+        path, depth = stack.pop()
+        try:
+            with os.scandir(path) as iterator:
+                entries = [entry for entry in iterator if not _matches(entry.name, exclude)]
+        except OSError as e:
+            if on_error is not None:
+                on_error(path, e)
+            continue
+        if key is not None:
+            entries.sort(key=key, reverse=reverse)
+        subdirs = []
+        for entry in entries:
+            yield entry, depth
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            if is_dir and (max_depth is None or depth < max_depth):
+                subdirs.append(entry.path)
+        # Push in reverse so subdirectories are visited in sorted order
+        for subdir in reversed(subdirs):
+            stack.append((subdir, depth + 1))
+
+
+def select(entries, include=(), files=True, dirs=False):
+    # Filter stage: keep files and/or directories whose names match the include globs
+    for entry, depth in entries:
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            is_dir = False
+        if (is_dir and not dirs) or (not is_dir and not files):
+            continue
+        if include and not _matches(entry.name, include):
+            continue
+        yield entry, depth, is_dir
+
+
+def pages(items, size):
+    page = []
+    for item in items:
+        page.append(item)
+        if len(page) >= size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def dir_task(task, root, max_depth, include, exclude, sort, reverse, show_dirs, page_size):
+    # BackgroundTask target used by the dir command: walk -> filter -> page -> output
+    started = time.perf_counter()
+    errors = []
+    entries = walk(root, max_depth, exclude, sort, reverse, lambda: task.stopped, lambda path, e: errors.append((path, e)))
+    listed = 0
+    for page in pages(select(entries, include, dirs=show_dirs), page_size):
+        if task.stopped:
+            return 1
+        files = []
+        for entry, depth, is_dir in page:
+            if is_dir:
+                if files:
+                    task.write("\n".join(files) + "\n")
+                    files = []
+                task.write(entry.path + os.sep + "\n", "bold")
+            else:
+                files.append(entry.path)
+        if files:
+            task.write("\n".join(files) + "\n")
+        listed += len(page)
+    if task.stopped:
+        return 1
+    for path, e in errors[:10]:
+        task.write(f"Cannot read {path}: {e.strerror or e}\n", "error")
+    if len(errors) > 10:
+        task.write(f"... and {len(errors) - 10} more unreadable directories\n", "error")
+    elapsed = time.perf_counter() - started
+    task.write(f"\n{listed} entries listed in {elapsed:.2f}s\n")
+    return 0
@@ -0,0 +1,216 @@
+import math
+import os
+import threading
+import time
+
+BUCKETS_PER_OCTAVE = 8  # Each bucket is ~9% wide, so percentiles are within ~9% of the true value
+
+
+class Histogram:
+    # Log-scale histogram of durations in seconds. Memory is a few hundred counters at most,
+    # however many samples are added.
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        micros = seconds * 1e6
+        index = 0 if micros < 1 else int(math.log2(micros) * BUCKETS_PER_OCTAVE) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        # Upper edge of the bucket holding the p-th percentile, in seconds (capped at the max seen)
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, 2 ** (index / BUCKETS_PER_OCTAVE) / 1e6)
+        return self.max
+
+
+class CommandStats:
+    def __init__(self):
+        self.wall = Histogram()
+        self.cpu = Histogram()
+        self.bytes = 0
+        self.lines = 0
+        self.failures = 0
+
+
+class MeteredOutput:
+    # Wraps a session's output sink to count what each command emits. Only installed while
+    # instrumentation is on, so the normal write path has no extra work.
+    def __init__(self, inner, metrics):
+        self.inner = inner
+        self.metrics = metrics
+
+    def write(self, text, tag=None):
+        if text:
+            self.metrics.bytes += len(text) if text.isascii() else len(text.encode("utf-8", "replace"))
+            self.metrics.lines += text.count("\n")
+        self.inner.write(text, tag)
+
+    def clear(self):
+        self.inner.clear()
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)  # pending_chars, flush, ... of the wrapped sink
+
+
+class Metrics:
+    # Per-command wall/CPU histograms, output volume and event-loop lag. Disabled by default;
+    # while disabled nothing is attached to the session and no probe is scheduled.
+    def __init__(self):
+        self.enabled = False
+        self.session = None
+        self.commands = {}
+        self.loop_lag = Histogram()
+        self.bytes = 0  # Output of the command currently running
+        self.lines = 0
+        self._started = None  # (command name, wall start, cpu start)
+        self._widget = None
+        self._probe_job = None
+        self._probe_due = 0.0
+        self._probe_ms = 250
+        self._trace = None
+        self._trace_lock = threading.Lock()
+        self._trace_first = True
+        self._trace_origin = time.perf_counter()
+
+    def enable(self, session):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.session = session
+        session.output = MeteredOutput(session.output, self)
+        session.listeners.append(self.on_session_event)
+        self._start_probe()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        session = self.session
+        if isinstance(session.output, MeteredOutput):
+            session.output = session.output.inner
+        session.listeners.remove(self.on_session_event)
+        self._stop_probe()
+        self._started = None
+
+    def reset(self):
+        self.commands.clear()
+        self.loop_lag = Histogram()
+
+    def on_session_event(self, kind, data):
+        if kind == "command":
+            self.bytes = self.lines = 0
+            self._started = (data["line"].split()[0], time.perf_counter(), time.process_time())
+        elif kind == "exit" and self._started is not None:
+            name, wall_start, cpu_start = self._started
+            self._started = None
+            wall = time.perf_counter() - wall_start
+            # Process CPU time: includes worker threads, not child processes
+            cpu = time.process_time() - cpu_start
+            if data["code"] == 127:
+                name = "(unknown)"  # Typos would otherwise each get their own row
+            stats = self.commands.get(name)
+            if stats is None:
+                stats = self.commands[name] = CommandStats()
+            stats.wall.add(wall)
+            stats.cpu.add(cpu)
+            stats.bytes += self.bytes
+            stats.lines += self.lines
+            if data["code"]:
+                stats.failures += 1
+            self.trace_event({"name": name, "cat": "command", "ph": "X", "ts": self._trace_ts(wall_start),
+                              "dur": wall * 1e6, "args": {"line": data["line"], "code": data["code"], "cpu_ms": cpu * 1000,
+                                                          "bytes": self.bytes, "lines": self.lines}})
+
+    # Event-loop lag: an after() callback that should fire every probe_ms; how late it runs is
+    # how long the Tk thread was busy with something else.
+    def watch_loop(self, widget, interval_ms=250):
+        self._widget = widget
+        self._probe_ms = max(10, int(interval_ms))
+        if self.enabled:
+            self._start_probe()
+
+    def _start_probe(self):
+        if self._widget is None or self._probe_job is not None:
+            return
+        self._probe_due = time.perf_counter() + self._probe_ms / 1000
+        self._probe_job = self._widget.after(self._probe_ms, self._probe)
+
+    def _stop_probe(self):
+        if self._probe_job is not None:
+            self._widget.after_cancel(self._probe_job)
+            self._probe_job = None
+
+    def _probe(self):
+        now = time.perf_counter()
+        lag = max(0.0, now - self._probe_due)
+        self.loop_lag.add(lag)
+        self.trace_event({"name": "loop lag", "cat": "loop", "ph": "C", "ts": self._trace_ts(now), "args": {"ms": lag * 1000}})
+        self._probe_due = now + self._probe_ms / 1000
+        self._probe_job = self._widget.after(self._probe_ms, self._probe)
+
+    # Trace export in the Chrome trace event format (chrome://tracing, Perfetto)
+    def start_trace(self, path):
+        self.stop_trace()
+        self._trace = open(path, "w")
+        self._trace.write("[\n")
+        self._trace_first = True
+
+    def stop_trace(self):
+        if self._trace is None:
+            return None
+        with self._trace_lock:
+            trace, self._trace = self._trace, None
+            trace.write("\n]\n")
+            trace.close()
+        return trace.name
+
+    @property
+    def tracing(self):
+        return self._trace is not None
+
+    def _trace_ts(self, perf_time):
+        return (perf_time - self._trace_origin) * 1e6
+
+    def trace_event(self, event):
+        if self._trace is None:
+            return
+        import json  # Only needed while a trace is being written
+        event.setdefault("pid", os.getpid())
+        event.setdefault("tid", threading.get_ident())
+        with self._trace_lock:
+            if self._trace is None:
+                return
+            self._trace.write(("" if self._trace_first else ",\n") + json.dumps(event))
+            self._trace_first = False
+
+    def report(self):
+        # Text table for the stats command
+        lines = []
+        if self.commands:
+            lines.append(f"{'Command':14} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'cpu p50':>9} {'bytes':>10} {'lines':>8}")
+            for name, stats in sorted(self.commands.items(), key=lambda item: -item[1].wall.total):
+                wall = stats.wall
+                lines.append(f"{name:14} {wall.count:6d} {wall.percentile(50) * 1000:9.2f} {wall.percentile(95) * 1000:9.2f} "
+                             f"{wall.percentile(99) * 1000:9.2f} {wall.max * 1000:9.2f} {stats.cpu.percentile(50) * 1000:9.2f} "
+                             f"{stats.bytes:10d} {stats.lines:8d}")
+        else:
+            lines.append("No commands recorded yet.")
+        lag = self.loop_lag
+        if lag.count:
+            lines.append(f"\nEvent loop lag ({lag.count} samples): p50 {lag.percentile(50) * 1000:.1f} ms, "
+                         f"p95 {lag.percentile(95) * 1000:.1f} ms, p99 {lag.percentile(99) * 1000:.1f} ms, max {lag.max * 1000:.1f} ms")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,59 @@
+from commands import parse_options
+from config import settings
+from portscan import looks_like_ports, parse_ports, scan_task
+
+
+def listports_command(term, args):
+    # listports [host] [ports] [--timeout <seconds>] [--concurrency <n>]
+    host = "localhost"
+    port_spec = settings['portscan_ports']
+    timeout = settings['portscan_timeout']
+    concurrency = settings['portscan_concurrency']
+    try:
+        positional, options = parse_options(args, value_options=("timeout", "concurrency"))
+        if "timeout" in options:
+            timeout = float(options["timeout"][-1])
+            if not timeout > 0:  # 0 would give up on every port before it could answer
+                term.output.write("\nUsage: listports [host] [ports] [--timeout <seconds>] [--concurrency <n>]"
+                                  " (the timeout must be more than 0 seconds)\n")
+                return 2
+        if "concurrency" in options:
+            concurrency = max(1, int(options["concurrency"][-1]))
+        if positional and not looks_like_ports(positional[0]):
+            host = positional.pop(0)
+        if positional:
+            port_spec = positional.pop(0)
+        ports = parse_ports(port_spec)
+    except ValueError as e:
+        term.output.write(f"\nFailed to list open ports: {str(e)}\n")
+        return 1
+    try:
+        term.run_task(scan_task, host, ports, timeout, concurrency,
+                      header=f"\nScanning {len(ports)} ports on {host}...\n")
+    except Exception as e:
+        term.output.write(f"\nFailed to list open ports: {str(e)}\n")
+        return 1
+
+
+def issue_command(term, args):
+    try:
+        import requests
+        issue_text = " ".join(args)
+        issue_count = getattr(term, 'issue_count', 0) + 1
+        setattr(term, 'issue_count', issue_count)
+        formatted_issue_text = f"**Community Issue #{issue_count}**:\n```{issue_text}```"
+        discord_webhook_url = "https://discord.com/api/webhooks/1251500620989595659/-T8_pur4o5Nirj9mdTaXcvOzR6idR9FB0iWaiyW0WmjXSTVF-IXj6aJZRjgGKyUaHui8"
+        data = {
+            "content": formatted_issue_text,
+            "username": "Nebula Terminal Community Issues",
+            #"avatar_url": "https://example.com/image.png"  # Optional: Add an avatar URL if desired
+        }
+        response = requests.post(discord_webhook_url, json=data)
+        if response.status_code == 204:
+            term.output.write("\nIssue submitted to Discord. Thank you!\n")
+        else:
+            term.output.write(f"\nFailed to submit issue to Discord: HTTP {response.status_code}\n")
+            return 1
+    except Exception as e:
+        term.output.write(f"\nFailed to submit issue to Discord: {str(e)}\n")
+        return 1
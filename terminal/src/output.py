@@ -0,0 +1,112 @@
+import tkinter as tk
+from collections import deque
+
+
+class OutputBuffer:
+    # Collects (text, tag) writes and pushes them into the Text widget once per frame
+    # with a single multi-segment insert, instead of one Tk round-trip per write.
+    # Only call this from the Tk thread; background work should hand results over
+    # through a queue first (see ProcessRunner).
+    def __init__(self, widget, frame_ms=16, max_chars_per_frame=256 * 1024):
+        self.widget = widget
+        self.frame_ms = frame_ms
+        self.max_chars_per_frame = max_chars_per_frame
+        self.pending = deque()
+        self.pending_chars = 0
+        self._flush_job = None
+        # Scrollback limits, 0 = unlimited. Trimming only kicks in once the widget is
+        # trim_batch lines over the limit so the top of the widget isn't deleted on every flush.
+        self.max_lines = 0
+        self.max_chars = 0
+        self.trim_batch = 500
+        self.widget_chars = 0  # Characters written through the buffer that are still in the widget
+        # Objects with output_inserted(first_line), output_trimmed(lines) and output_cleared(),
+        # for things that track the widget's contents (highlighting) without rescanning it
+        self.observers = []
+
+    def set_scrollback(self, max_lines=0, max_chars=0, trim_batch=500):
+        self.max_lines = max(0, int(max_lines))
+        self.max_chars = max(0, int(max_chars))
+        self.trim_batch = max(1, int(trim_batch))
+        self.trim_scrollback()
+
+    def write(self, text, tag=None):
+        if not text:
+            return
+        tags = (tag,) if isinstance(tag, str) else tuple(tag or ())
+        # Merge with the previous segment when the tags match so the insert stays short
+        if self.pending and self.pending[-1][1] == tags:
+            self.pending[-1][0].append(text)
+        else:
+            self.pending.append(([text], tags))
+        self.pending_chars += len(text)
+        if self._flush_job is None:
+            self._flush_job = self.widget.after(self.frame_ms, self._on_frame)
+
+    def _on_frame(self):
+        self._flush_job = None
+        self.flush(self.max_chars_per_frame)
+        if self.pending:
+            self._flush_job = self.widget.after(self.frame_ms, self._on_frame)
+
+    def flush(self, limit=None):
+        # Write out pending segments (up to roughly `limit` characters) in one insert call
+        if not self.pending:
+            return
+        args = []
+        written = 0
+        while self.pending and (limit is None or written < limit):
+            parts, tags = self.pending.popleft()
+            text = "".join(parts)
+            args.extend((text, tags))
+            written += len(text)
+        self.pending_chars -= written
+        self.widget_chars += written
+        follow = self.widget.yview()[1] >= 1.0  # Only auto-scroll if the view is already at the bottom
+        first_line = int(self.widget.index("end-1c").split(".")[0]) if self.observers else 0
+        self.widget.insert(tk.END, *args)
+        for observer in self.observers:
+            observer.output_inserted(first_line)
+        self.trim_scrollback()
+        if follow:
+            self.widget.see(tk.END)
+
+    def line_count(self):
+        return int(self.widget.index("end-1c").split(".")[0])
+
+    def trim_scrollback(self):
+        # Drop whole lines from the top once a limit is exceeded, in batches
+        cut_line = 0
+        if self.max_lines:
+            excess = self.line_count() - self.max_lines
+            if excess >= self.trim_batch:
+                cut_line = excess + 1
+        if self.max_chars and self.widget_chars > self.max_chars:
+            excess = self.widget_chars - self.max_chars
+            # Cut at least a batch worth of characters past the limit, rounded up to a full line
+            cut_index = self.widget.index(f"1.0 + {excess + self.trim_batch * 80} chars")
+            cut_line = max(cut_line, int(cut_index.split(".")[0]) + 1)
+        if not cut_line:
+            return 0
+        cut_line = min(cut_line, self.line_count())  # Never remove the line being typed on
+        if cut_line <= 1:
+            return 0
+        removed = self.widget.count("1.0", f"{cut_line}.0", "chars")
+        if isinstance(removed, tuple):
+            removed = removed[0]
+        self.widget.delete("1.0", f"{cut_line}.0")
+        self.widget_chars = max(0, self.widget_chars - (removed or 0))
+        for observer in self.observers:
+            observer.output_trimmed(cut_line - 1)
+        return cut_line - 1
+
+    def discard(self):
+        self.pending.clear()
+        self.pending_chars = 0
+
+    def clear(self):
+        self.discard()
+        self.widget_chars = 0
+        self.widget.delete("1.0", tk.END)
+        for observer in self.observers:
+            observer.output_cleared()
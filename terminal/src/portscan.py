@@ -0,0 +1,108 @@
+import asyncio
+import socket
+import time
+
+
+def parse_ports(spec):
+    # "22,80,8000-8100" -> sorted unique list of ports
+    ports = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            start, end = int(start), int(end)
+            if start > end:
+                start, end = end, start
+            ports.update(range(start, end + 1))
+        else:
+            ports.add(int(part))
+    if not ports or min(ports) < 1 or max(ports) > 65535:
+        raise ValueError(f"Invalid port range: {spec}")
+    return sorted(ports)
+
+
+def looks_like_ports(text):
+    return bool(text) and all(c.isdigit() or c in ",-" for c in text)
+
+
+def resolve_host(host):
+    # Resolve once up front instead of once per connection attempt. IPv4 comes first when there is
+    # one: "localhost" often resolves to ::1 first, and most local servers only listen on 127.0.0.1.
+    results = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    family, _, _, _, address = min(results, key=lambda result: result[0] != socket.AF_INET)
+    return address[0]
+
+
+async def _probe(address, port, timeout):
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def _scan(address, ports, timeout, concurrency, on_open, on_progress, should_stop):
+    pending = iter(ports)
+    done = 0
+
+    async def worker():
+        nonlocal done
+        for port in pending:  # Workers share one iterator, so at most `concurrency` probes are in flight
+            if should_stop():
+                return
+            if await _probe(address, port, timeout):
+                on_open(port)
+            done += 1
+            if on_progress is not None:
+                on_progress(done, len(ports))
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(ports))))))
+
+
+def scan_ports(host, ports, timeout=0.5, concurrency=256, on_open=None, on_progress=None, should_stop=None):
+    # Blocking call meant for a worker thread; returns the sorted open ports
+    address = resolve_host(host)
+    open_ports = []
+
+    def found(port):
+        open_ports.append(port)
+        if on_open is not None:
+            on_open(port)
+
+    asyncio.run(_scan(address, ports, timeout, concurrency, found, on_progress, should_stop or (lambda: False)))
+    return sorted(open_ports)
+
+
+def scan_task(task, host, ports, timeout, concurrency):
+    # BackgroundTask target used by the listports command
+    started = time.perf_counter()
+    next_report = [started + 1.0]
+
+    def on_open(port):
+        task.write(f"  Port {port} open\n", "success")
+
+    def on_progress(done, total):
+        now = time.perf_counter()
+        if done == total or now >= next_report[0]:
+            next_report[0] = now + 1.0  # At most one progress line per second
+            if done != total:
+                task.write(f"  ... {done}/{total} ports scanned\n")
+
+    open_ports = scan_ports(host, ports, timeout, concurrency, on_open, on_progress, lambda: task.stopped)
+    if task.stopped:
+        return 1
+    elapsed = time.perf_counter() - started
+    if open_ports:
+        ports_str = ', '.join(map(str, open_ports))
+        task.write(f"\nOpen ports: {ports_str}\n")
+    else:
+        task.write("\nNo open ports found.\n")
+    task.write(f"Scanned {len(ports)} ports on {host} in {elapsed:.2f}s\n")
+    return 0
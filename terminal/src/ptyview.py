@@ -0,0 +1,156 @@
+import time
+from tkinter import font as tkfont
+
+from config import settings
+
+KEYS = {
+    "Return": "\r", "KP_Enter": "\r", "BackSpace": "\x7f", "Tab": "\t", "ISO_Left_Tab": "\x1b[Z", "Escape": "\x1b",
+    "Insert": "\x1b[2~", "Delete": "\x1b[3~", "Prior": "\x1b[5~", "Next": "\x1b[6~", "Home": "\x1b[H", "End": "\x1b[F",
+    "F1": "\x1bOP", "F2": "\x1bOQ", "F3": "\x1bOR", "F4": "\x1bOS", "F5": "\x1b[15~", "F6": "\x1b[17~",
+    "F7": "\x1b[18~", "F8": "\x1b[19~", "F9": "\x1b[20~", "F10": "\x1b[21~", "F11": "\x1b[23~", "F12": "\x1b[24~",
+}
+CURSOR_KEYS = {"Up": "A", "Down": "B", "Right": "C", "Left": "D"}
+ALT_MASK = 0x8  # Mod1 on X11
+
+
+def screen_size(widget):
+    # Rows and columns of monospace cells that fit in the Text widget
+    font = tkfont.Font(font=widget.cget("font"))
+    border = 2 * (int(widget.cget("borderwidth")) + int(widget.cget("highlightthickness")))
+    width = widget.winfo_width() - border - 2 * int(widget.cget("padx"))
+    height = widget.winfo_height() - border - 2 * int(widget.cget("pady"))
+    return max(5, height // max(1, font.metrics("linespace"))), max(20, width // max(1, font.measure("0")))
+
+
+class PtyView:
+    # Draws a PtyRunner's screen in the last lines of the terminal's Text widget and sends keys to
+    # the program. Only rows the parser marked as damaged are rewritten, at most pty_fps times a
+    # second however fast the program writes; lines that scrolled off the top of the screen go into
+    # the normal scrollback above it. Keys reach the program through a bindtag placed in front of
+    # the widget's own bindings, so Return, Tab and Ctrl-C go to the program while it runs.
+    def __init__(self, terminal, runner):
+        self.terminal = terminal
+        self.widget = terminal.text_widget
+        self.runner = runner
+        self.frame_s = 1 / max(1, settings['pty_fps'])
+        self.last_frame = 0.0
+        self.closed = False
+        self._job = None
+        self._size = (runner.screen.rows, runner.screen.cols)
+        self.rebuild = True  # Redraw every row and re-place the region (first frame, resize)
+        widget = self.widget
+        terminal.output.flush()
+        if widget.index("end-1c") != "1.0" and widget.get("end-2c") != "\n":
+            widget.insert("end", "\n")
+        widget.mark_set("pty_top", "end-1c")
+        widget.mark_gravity("pty_top", "left")
+        widget.tag_configure("pty-cursor", background=terminal.font_color, foreground=terminal.bg_color)
+        widget.bind_class("PtyInput", "<Key>", self.on_key)
+        widget.bind_class("PtyInput", "<Configure>", self.on_resize)
+        widget.bindtags(("PtyInput",) + tuple(tag for tag in widget.bindtags() if tag != "PtyInput"))
+        runner.view = self
+        self.update()
+
+    def on_key(self, event):
+        if self.closed:
+            return None
+        keysym = event.keysym
+        if keysym in CURSOR_KEYS:
+            data = ("\x1bO" if self.runner.screen.app_cursor else "\x1b[") + CURSOR_KEYS[keysym]
+        else:
+            data = KEYS.get(keysym) or event.char
+        if data:
+            self.runner.write(("\x1b" + data) if event.state & ALT_MASK and len(data) == 1 else data)
+        return "break"
+
+    def on_resize(self, event=None):
+        if self.closed:
+            return
+        size = screen_size(self.widget)
+        if size != self._size:
+            self._size = size
+            self.runner.resize(*size)
+            self.rebuild = True
+            self.update()
+
+    def update(self):
+        # Called whenever the runner reports a change; draws now or at the start of the next frame
+        if self.closed:
+            return
+        wait = self.last_frame + self.frame_s - time.perf_counter()
+        if wait > 0 and not self.runner.finished:
+            if self._job is None:
+                self._job = self.widget.after(int(wait * 1000) + 1, self._on_frame)
+            return
+        self.render()
+        if self.runner.finished:
+            self.close()
+
+    def _on_frame(self):
+        self._job = None
+        self.update()
+
+    def render(self):
+        self.last_frame = time.perf_counter()
+        runner = self.runner
+        screen = runner.screen
+        with screen.lock:
+            scrolled = screen.take_scrolled()
+            dropped, runner.dropped = runner.dropped, 0
+            rows = screen.take_damage(everything=self.rebuild or bool(scrolled))
+            cursor = (screen.y, screen.x) if screen.cursor_visible else None
+            row_count = screen.rows
+        widget = self.widget
+        highlighter = self.terminal.highlighter
+        follow = widget.yview()[1] >= 1.0
+        if scrolled or dropped or self.rebuild:
+            # Lines that left the screen are ordinary output now: delete the screen, append them
+            # through the output buffer (scrollback limits, highlighting) and draw the screen below
+            self.rebuild = False
+            output = self.terminal.output
+            widget.delete("pty_top", "end-1c")
+            if dropped:
+                output.write(f"[{dropped} lines skipped]\n", "bold")
+            for pieces in scrolled:
+                for text, tags in pieces:
+                    highlighter.configure_ansi(tags)
+                    output.write(text, tags)
+                output.write("\n")
+            output.flush()
+            widget.mark_set("pty_top", "end-1c")
+            widget.insert("end-1c", "\n" * (row_count - 1))
+        top = int(widget.index("pty_top").split(".")[0])
+        for row, pieces in rows.items():
+            line = top + row
+            widget.delete(f"{line}.0", f"{line}.0 lineend")
+            args = []
+            for text, tags in pieces:
+                highlighter.configure_ansi(tags)
+                args.extend((text, tags))
+            if args:
+                widget.insert(f"{line}.0", *args)
+        widget.tag_remove("pty-cursor", "pty_top", "end")
+        if cursor is not None and not runner.finished:
+            line, column = top + cursor[0], cursor[1]
+            length = int(widget.index(f"{line}.0 lineend").split(".")[1])
+            if length <= column:
+                widget.insert(f"{line}.0 lineend", " " * (column - length + 1))
+            widget.tag_add("pty-cursor", f"{line}.{column}")
+            widget.mark_set("insert", f"{line}.{column}")
+        if follow:
+            widget.see("end")
+
+    def close(self):
+        # The program is done: leave its last screen as plain output, minus trailing blank rows
+        self.closed = True
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        widget = self.widget
+        widget.bindtags(tuple(tag for tag in widget.bindtags() if tag != "PtyInput"))
+        widget.tag_remove("pty-cursor", "pty_top", "end")
+        last = widget.index("end-1c")
+        while widget.compare(last, ">", "pty_top") and not widget.get(f"{last} linestart", last).strip():
+            widget.delete(f"{last} linestart - 1c", last)
+            last = widget.index("end-1c")
+        widget.mark_unset("pty_top")
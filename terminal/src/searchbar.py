@@ -0,0 +1,201 @@
+import bisect
+import re
+import tkinter as tk
+
+from config import settings
+
+
+class SearchBar:
+    # Ctrl-F search over the scrollback. Queries run against the terminal's LineIndex rather than
+    # the Text widget, so each keystroke is one pass over a few joined strings. At most
+    # search_max_matches matches around the current one carry the highlight tag at a time;
+    # Return / Shift-Return (or Down / Up) move between matches, Escape closes the bar.
+    def __init__(self, terminal):
+        self.terminal = terminal
+        self.widget = terminal.text_widget
+        self.index = terminal.scrollback.index
+        self.matches = []
+        self.current = None
+        self.window = (0, 0)  # Slice of matches that is highlighted
+        self.query = None  # (text, regex) the matches are for
+        self.version = None  # Index version the matches are for
+        self.trimmed = 0  # Lines the index had trimmed then, to follow the matches across later trims
+        self._job = None
+        self.frame = tk.Frame(terminal, bg=terminal.bg_color)
+        self.entry = tk.Entry(self.frame, bg=terminal.bg_color, fg=terminal.font_color, insertbackground=terminal.cursor_color,
+                              font=(terminal.font_family, terminal.font_size))
+        self.regex = tk.BooleanVar(value=False)
+        regex_button = tk.Checkbutton(self.frame, text="Regex", variable=self.regex, command=self.schedule,
+                                      bg=terminal.bg_color, fg=terminal.font_color, selectcolor=terminal.bg_color)
+        self.status = tk.Label(self.frame, bg=terminal.bg_color, fg=terminal.font_color, width=24, anchor="w")
+        self.entry.pack(side="left", fill="x", expand=True)
+        regex_button.pack(side="left")
+        self.status.pack(side="left")
+        self.entry.bind("<KeyRelease>", self.schedule)
+        self.entry.bind("<Return>", lambda event: self.move(1))
+        self.entry.bind("<Down>", lambda event: self.move(1))
+        self.entry.bind("<Shift-Return>", lambda event: self.move(-1))
+        self.entry.bind("<Up>", lambda event: self.move(-1))
+        self.entry.bind("<Escape>", self.close)
+        self.widget.tag_configure("search-match", background="#6b5b00")
+        self.widget.tag_configure("search-current", background="#ff9f1a", foreground="black")
+
+    def open(self, event=None):
+        if not self.frame.winfo_ismapped():
+            self.frame.pack(side="bottom", fill="x", before=self.widget)
+        self.entry.focus_set()
+        self.entry.select_range(0, "end")
+        if self.entry.get():
+            self.search()
+        return "break"
+
+    def close(self, event=None):
+        self.frame.pack_forget()
+        self.widget.tag_remove("search-match", "1.0", "end")
+        self.widget.tag_remove("search-current", "1.0", "end")
+        self.widget.focus_set()
+        return "break"
+
+    def schedule(self, event=None):
+        # Search once typing pauses for a moment; keys that don't change the query do nothing
+        if (self.entry.get(), self.regex.get()) == self.query:
+            return
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+        self._job = self.widget.after(30, self.search)
+
+    def search(self, keep=None, step=0):
+        # keep: (absolute line, column) of the match to move on from by step (0 = stay on it);
+        # without it start at the last, most recent match
+        self._job = None
+        text, regex = self.entry.get(), self.regex.get()
+        self.query = (text, regex)
+        self.version = self.index.version
+        self.trimmed = self.index.trimmed
+        self.widget.tag_remove("search-match", "1.0", "end")
+        self.widget.tag_remove("search-current", "1.0", "end")
+        self.matches, self.current, self.window = [], None, (0, 0)
+        if not text:
+            self.status.config(text="")
+            return
+        try:
+            self.matches = self.index.search(text, regex=regex)
+        except re.error as e:
+            self.status.config(text=f"Bad pattern: {e}")
+            return
+        if not self.matches:
+            self.status.config(text="No matches")
+            return
+        self.current = len(self.matches) - 1
+        if keep is not None:
+            positions = [(line + self.trimmed, column) for line, column, _ in self.matches]
+            if step < 0:
+                self.current = (bisect.bisect_left(positions, keep) - 1) % len(positions)
+            else:
+                self.current = bisect.bisect_right(positions, keep) if step else bisect.bisect_left(positions, keep)
+                self.current %= len(positions)
+        self.show()
+
+    def move(self, step):
+        if self._job is not None or self.version != self.index.version:
+            # The query or the scrollback changed since the last search: search again from here
+            keep = None
+            if self.current is not None and self._job is None:
+                line, column, _ = self.matches[self.current]
+                keep = (line + self.trimmed, column)
+            self.search(keep, step)
+        elif self.matches:
+            self.current = (self.current + step) % len(self.matches)
+            self.show()
+        return "break"
+
+    def show(self):
+        widget = self.widget
+        first, last = self.window
+        if not first <= self.current < last:
+            # Highlight the matches around the current one in a single tag_add call
+            limit = max(1, settings['search_max_matches'])
+            first = max(0, min(self.current - limit // 2, len(self.matches) - limit))
+            last = min(len(self.matches), first + limit)
+            self.window = (first, last)
+            widget.tag_remove("search-match", "1.0", "end")
+            ranges = []
+            for line, start, end in self.matches[first:last]:
+                ranges.extend((f"{line}.{start}", f"{line}.{end}"))
+            widget.tag_add("search-match", *ranges)
+            widget.tag_raise("search-match")  # Above output and ANSI colours
+            widget.tag_raise("search-current")
+        line, start, end = self.matches[self.current]
+        widget.tag_remove("search-current", "1.0", "end")
+        widget.tag_add("search-current", f"{line}.{start}", f"{line}.{end}")
+        widget.see(f"{line}.{start}")
+        self.status.config(text=f"{self.current + 1} of {len(self.matches)}")
+
+
+class HistoryBar:
+    # Ctrl-R reverse search through the command history store. Typing finds the newest command
+    # containing the text, Ctrl-R again the next older one. Return puts the command on the prompt
+    # to edit or run; Escape leaves the prompt as it was.
+    def __init__(self, terminal):
+        self.terminal = terminal
+        self.widget = terminal.text_widget
+        self.match = None  # (history id, line) shown
+        self.text = None  # Text the match is for
+        self.frame = tk.Frame(terminal, bg=terminal.bg_color)
+        label = tk.Label(self.frame, text="History:", bg=terminal.bg_color, fg=terminal.font_color)
+        self.entry = tk.Entry(self.frame, bg=terminal.bg_color, fg=terminal.font_color, insertbackground=terminal.cursor_color,
+                              font=(terminal.font_family, terminal.font_size), width=24)
+        self.status = tk.Label(self.frame, bg=terminal.bg_color, fg=terminal.font_color, anchor="w",
+                               font=(terminal.font_family, terminal.font_size))
+        label.pack(side="left")
+        self.entry.pack(side="left")
+        self.status.pack(side="left", fill="x", expand=True)
+        self.entry.bind("<KeyRelease>", lambda event: self.search())
+        self.entry.bind("<Control-r>", lambda event: self.search(older=True))
+        self.entry.bind("<Return>", self.accept)
+        self.entry.bind("<Escape>", self.close)
+
+    def open(self, event=None):
+        if not self.frame.winfo_ismapped():
+            self.frame.pack(side="bottom", fill="x", before=self.widget)
+        self.entry.delete(0, "end")
+        self.entry.insert(0, self.terminal.current_input().strip())
+        self.match, self.text = None, None
+        self.entry.focus_set()
+        self.search()
+        return "break"
+
+    def close(self, event=None):
+        self.frame.pack_forget()
+        self.widget.focus_set()
+        return "break"
+
+    def search(self, older=False):
+        text = self.entry.get()
+        if text == self.text and not older:
+            return "break"
+        self.text = text
+        if not text:
+            self.match = None
+            self.status.config(text="")
+            return "break"
+        store = self.terminal.store
+        if older and self.match is not None:
+            match = store.search(text, self.match[0], self.match[1])
+        else:
+            match = store.search(text)
+        if match is None:
+            if older:
+                self.widget.bell()  # Keep showing the oldest match
+            else:
+                self.match = None
+                self.status.config(text="No match")
+            return "break"
+        self.match = match
+        self.status.config(text=match[1])
+        return "break"
+
+    def accept(self, event=None):
+        if self.match is not None:
+            self.terminal.replace_input(self.match[1])
+        return self.close()
@@ -0,0 +1,218 @@
+import os
+import time
+
+from commands import registry
+from config import settings
+from dircache import DirectoryCache
+from diskusage import UsageCache
+from jobs import JobManager, deliver_event
+from metrics import Metrics
+
+
+class Session:
+    # Command state and execution with no UI attached: the current directory, the directory cache
+    # and the command currently running. Command handlers get the session as `term`.
+    # A frontend supplies `output` (anything with write(text, tag) and clear()), calls run() with
+    # each command line and pump() while a background command is active. Anything that needs a
+    # window (the file viewer, window settings) is forwarded to `frontend` when there is one.
+    def __init__(self, output, current_directory=None, frontend=None):
+        self.output = output
+        self.frontend = frontend
+        self.current_directory = current_directory or os.path.expanduser("~/Downloads")
+        self.dir_cache = DirectoryCache(max_entries=settings['dir_cache_size'])
+        self.usage_cache = UsageCache(settings['diskusage_cache_dirs'])  # diskusage <path> results by directory mtime
+        self.command_index = None  # FuzzyIndex over command names, built on the first typo
+        self.active_task = None  # ProcessRunner/BackgroundTask of the command currently streaming output
+        self.listeners = []  # Called as listener(kind, data) for "command", "directory", "exit" and "job" events
+        self.scrollback = None  # LineIndex of the frontend's output, for the filter command
+        self.jobs = JobManager(self, settings['max_jobs'], settings['job_buffer_chars'])  # Commands run with a trailing &
+        self._line = None  # Command line that owns active_task
+        self._started = 0.0
+        self._on_exit = None
+        self.metrics = Metrics()  # Attaches itself to the session only while turned on
+        if settings['instrumentation'] or settings['trace_file']:
+            self.metrics.enable(self)  # The trace is written from the instrumentation's events
+        if settings['trace_file']:
+            self.metrics.start_trace(settings['trace_file'])
+
+    def emit(self, kind, data):
+        for listener in self.listeners:
+            listener(kind, data)
+
+    def run(self, line):
+        # Run one command line. Returns the background task it started (pump() until it is done),
+        # or None if the command already finished. A trailing & starts the command as a job instead.
+        line = line.strip()
+        background = line.endswith("&")
+        parts = line.rstrip("&").split()
+        if not parts:
+            return None
+        if self.active_task is not None:
+            raise RuntimeError("A command is still running")
+        line = " ".join(parts)
+        directory = self.current_directory
+        self.emit("command", {"line": line + (" &" if background else ""), "cwd": directory})
+        self._line = line
+        self._started = time.perf_counter()
+        command = registry.get(parts[0])
+        if background and (command.accepts(parts[1:]) if command is not None else self.find_program(parts[0], parts[1:])):
+            job = self.jobs.submit(line)
+            queued = " (waiting for a free slot)" if job.state == "queued" else ""
+            self.output.write(f"\n[{job.id}] {line}{queued}\n", "bold")
+            code = 0
+        else:
+            code = self.execute(parts[0], parts[1:])
+        if self.current_directory != directory:
+            self.emit("directory", {"cwd": self.current_directory})
+        if self.active_task is None:
+            self.emit("exit", {"line": line, "code": code, "cancelled": False, "seconds": time.perf_counter() - self._started})
+        return self.active_task
+
+    def execute(self, name, args):
+        # Returns an exit status: what the handler returned (None counts as 0, handlers return 1 after
+        # reporting an error), 2 for bad arguments, 127 if unknown
+        command = registry.get(name)
+        if command is None:
+            code = self.run_program(name, args)
+            if code is None:
+                self.handle_unknown_command(name)
+                return 127
+            return code
+        if not command.accepts(args):
+            self.output.write(f"\nUsage: {command.usage}\n")
+            return 2
+        return command(self, args) or 0
+
+    def find_program(self, name, args):
+        # argv for an unknown command that names a program (on PATH or by path), or None
+        if not settings['pty_passthrough']:
+            return None
+        import shlex
+        import shutil  # Both only needed once a command isn't built in, and shutil pulls in bz2 and lzma
+        if os.path.dirname(name):
+            path = os.path.join(self.current_directory, os.path.expanduser(name))
+            path = path if os.path.isfile(path) and os.access(path, os.X_OK) else None
+        else:
+            path = shutil.which(name)
+        if path is None:
+            return None
+        try:
+            args = shlex.split(" ".join(args), posix=os.name == "posix")  # Programs expect shell-style quoting
+        except ValueError:
+            pass  # Unbalanced quotes; pass the words as typed
+        return [path] + args
+
+    def run_program(self, name, args):
+        # Programs run in a pseudo-terminal, or with plain pipes where there is none (Windows).
+        # Returns None if name isn't a program.
+        argv = self.find_program(name, args)
+        if argv is None:
+            return None
+        import shutil
+        from executor import PtyRunner, pty_supported
+        try:
+            if not pty_supported():
+                self.run_external(argv, header="\n")
+                return 0
+            rows, cols = self.frontend.terminal_size() if self.frontend is not None else shutil.get_terminal_size()[::-1]
+            runner = PtyRunner(argv, cwd=self.current_directory, rows=rows, cols=cols,
+                               max_scrolled=settings['pty_scrolled_lines']).start()
+        except OSError as e:
+            self.output.write(f"\nFailed to run {name}: {str(e)}\n", "error")
+            return 126
+        if self.frontend is not None:
+            self.frontend.attach_pty(runner)
+        self.follow_task(runner)
+        return 0
+
+    def handle_unknown_command(self, command):
+        self.output.write(f"\nCommand '{command}' not recognized. Type 'help' for a list of available commands.\n", "error")
+        self.suggest_correction(command)
+
+    def suggest_correction(self, input_text):
+        if self.command_index is None:
+            from fuzzy import FuzzyIndex  # Typo suggestions without comparing against every candidate
+            self.command_index = FuzzyIndex(registry.names())
+        cutoff = settings['suggestion_cutoff']
+        suggestions = self.command_index.search(input_text, k=1, cutoff=cutoff)
+
+        # Directory and file suggestions come from the cached listing's prebuilt indexes
+        snapshot = self.dir_cache.get(self.current_directory)
+        if snapshot is not None:
+            suggestions += snapshot.fuzzy_index("dirs").search(input_text, k=1, cutoff=cutoff)
+            suggestions += snapshot.fuzzy_index("files").search(input_text, k=1, cutoff=cutoff)
+        suggestions.sort(key=lambda item: -item[0])
+
+        if suggestions:
+            suggestion_text = f"Did you mean: {', '.join(word for _, word in suggestions)}?"
+            self.output.write(suggestion_text + "\n", "bold")
+        else:
+            self.output.write("No suggestions found.\n", "bold")
+
+    def run_external(self, argv, header=None, on_exit=None):
+        # Start argv in the background; its output reaches `output` as the frontend pumps.
+        # Popen errors propagate to the caller so each command keeps its own error message.
+        self.follow_task(self.start_external(argv, self.current_directory), header, on_exit)
+
+    def run_task(self, target, *args, header=None, on_exit=None, timeout=0):
+        # Same as run_external, for Python work such as scans and directory walks
+        self.follow_task(self.start_task(target, *args, timeout=timeout), header, on_exit)
+
+    def start_external(self, argv, cwd):
+        from executor import ProcessRunner  # subprocess is only loaded once a command needs it
+        timeout = settings['command_timeouts'].get(argv[0], 0)
+        return ProcessRunner(argv, cwd=cwd, timeout=timeout).start()
+
+    def start_task(self, target, *args, timeout=0):
+        from executor import BackgroundTask
+        return BackgroundTask(target, *args, timeout=timeout).start()
+
+    def follow_task(self, task, header=None, on_exit=None):
+        self.active_task = task
+        self._on_exit = on_exit
+        if header:
+            self.output.write(header)
+
+    def pump(self, limit=256, wait=None):
+        # Move queued events of the active task to the output. Returns True once no task is running.
+        task = self.active_task
+        if task is None:
+            return True
+        finished = False
+        for kind, data in task.read_events(limit, wait):
+            finished = deliver_event(self.output, kind, data) or finished
+        if not finished:
+            return False
+        self.active_task = None
+        on_exit, self._on_exit = self._on_exit, None
+        if task.cancelled:
+            self.output.write("\n^C\n", "error")
+        elif on_exit is not None:
+            on_exit(task.returncode)
+        self.emit("exit", {"line": self._line, "code": task.returncode, "cancelled": task.cancelled,
+                           "seconds": time.perf_counter() - self._started})
+        return True
+
+    def cancel(self):
+        if self.active_task is None:
+            return False
+        self.active_task.cancel()
+        return True
+
+    def open_viewer(self, path, start_line=None, follow=False, hex_view=False):
+        if self.frontend is None:
+            raise RuntimeError("The file viewer needs a display")
+        return self.frontend.open_viewer(path, start_line=start_line, follow=follow, hex_view=hex_view)
+
+    def apply_settings(self):
+        if self.frontend is not None:
+            self.frontend.apply_settings()
+
+    def save_setting(self, key, value):
+        # Keep a changed setting for the next start; only a frontend has somewhere to keep it
+        if self.frontend is not None:
+            self.frontend.save_setting(key, value)
+
+    def apply_output_settings(self):
+        if self.frontend is not None:
+            self.frontend.apply_output_settings()
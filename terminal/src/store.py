@@ -0,0 +1,193 @@
+import json
+import os
+import sys
+import time
+
+MAX_ID = 2 ** 63 - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    line TEXT NOT NULL,
+    cwd TEXT NOT NULL,
+    started REAL NOT NULL,  -- Unix time
+    seconds REAL NOT NULL,
+    status INTEGER  -- Exit status, NULL if the command was cancelled
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    address TEXT PRIMARY KEY,
+    first_seen REAL NOT NULL
+);
+"""
+# Substring index over history lines for Ctrl-R, kept in step by triggers. The trigram tokenizer
+# needs SQLite 3.34; without it search falls back to a LIKE scan from the newest line.
+TEXT_INDEX = """
+CREATE VIRTUAL TABLE history_text USING fts5(line, content='history', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER history_text_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_text(rowid, line) VALUES (new.id, new.line);
+END;
+CREATE TRIGGER history_text_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_text(history_text, rowid, line) VALUES ('delete', old.id, old.line);
+END;
+INSERT INTO history_text(history_text) VALUES ('rebuild');
+"""
+
+
+def data_dir():
+    # Per-user directory for the history database and saved settings
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.environ.get("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "NebulaTerminal")
+
+
+class SettingsFile:
+    # Settings changed with the settings command, saved as JSON on top of the defaults in config.py.
+    # Each save writes a temporary file and renames it over the old one, so a crash leaves either
+    # the previous file or the new one, never a mix.
+    def __init__(self, path):
+        self.path = path
+        self.values = {}
+
+    def load(self, settings):
+        # Apply saved values whose key still exists with the same type; anything else is ignored
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                values = json.load(file)
+        except (OSError, ValueError):
+            return
+        if not isinstance(values, dict):
+            return
+        for key, value in values.items():
+            default = settings.get(key)
+            if key in settings and (type(value) is type(default) or isinstance(default, float) and type(value) is int):
+                settings[key] = value
+                self.values[key] = value
+
+    def save(self, key, value):
+        import tempfile
+        self.values[key] = value
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".settings-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(self.values, file, indent=2, sort_keys=True)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.path)
+        except BaseException:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            raise
+
+
+class HistoryStore:
+    # Command history and the hosts seen before, in an SQLite database in WAL mode (a crash never
+    # leaves it half-written, and other windows can read while one writes). Up/Down walk the
+    # primary key and Ctrl-R uses the trigram index, so neither scans the history. Opened on a
+    # worker thread and only used from the Tk thread after that.
+    def __init__(self, path, max_entries=200000):
+        import sqlite3  # ~10 ms to import, so only once the first prompt is up
+        self.Error = sqlite3.Error
+        self.max_entries = max_entries
+        self.running = None  # (line, cwd, start time) of the command being run
+        self._until_prune = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; a power cut may lose the last commands
+            self.db.executescript(SCHEMA)
+            self.text_index = self._create_text_index()
+            self.prune()
+        except sqlite3.Error as e:
+            raise OSError(f"Cannot open {path}: {e}") from e
+
+    def _create_text_index(self):
+        if self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_text'").fetchone():
+            return True
+        try:
+            self.db.executescript(f"BEGIN; {TEXT_INDEX} COMMIT;")
+            return True
+        except self.Error:  # No FTS5 or no trigram tokenizer
+            if self.db.in_transaction:
+                self.db.execute("ROLLBACK")
+            return False
+
+    def close(self):
+        self.db.close()
+
+    def on_event(self, kind, data):
+        # Session listener: a command line is stored once it finishes, with how it went
+        if kind == "command":
+            self.running = (data["line"], data["cwd"], time.time())
+        elif kind == "exit" and self.running is not None:
+            line, cwd, started = self.running
+            self.running = None
+            self.record(line, cwd, started, data["seconds"], None if data["cancelled"] else data["code"])
+
+    def record(self, line, cwd, started, seconds, status):
+        try:
+            self.db.execute("INSERT INTO history (line, cwd, started, seconds, status) VALUES (?, ?, ?, ?, ?)",
+                            (line, cwd, started, seconds, status))
+            self._until_prune -= 1
+            if self._until_prune <= 0:
+                self.prune()
+        except self.Error:
+            pass  # A locked or read-only database must not stop the command from running
+
+    def prune(self):
+        # Keep the newest max_entries lines; checked every 1000 commands rather than on each one
+        self._until_prune = 1000
+        if self.max_entries:
+            self.db.execute("DELETE FROM history WHERE id <= (SELECT MAX(id) FROM history) - ?", (self.max_entries,))
+
+    def previous(self, before_id=None, skip=None):
+        # Newest entry older than before_id whose line isn't skip, as (id, line), or None
+        return self.db.execute("SELECT id, line FROM history WHERE id < ? AND line IS NOT ? ORDER BY id DESC LIMIT 1",
+                               (MAX_ID if before_id is None else before_id, skip)).fetchone()
+
+    def next(self, after_id, skip=None):
+        return self.db.execute("SELECT id, line FROM history WHERE id > ? AND line IS NOT ? ORDER BY id LIMIT 1",
+                               (after_id, skip)).fetchone()
+
+    def search(self, text, before_id=None, skip=None):
+        # Newest entry older than before_id containing text (ignoring ASCII case), as (id, line)
+        before_id = MAX_ID if before_id is None else before_id
+        if self.text_index and len(text) >= 3:  # Trigrams need three characters
+            return self.db.execute(
+                "SELECT history.id, history.line FROM history_text JOIN history ON history.id = history_text.rowid "
+                "WHERE history_text MATCH ? AND history_text.rowid < ? AND history.line IS NOT ? "
+                "ORDER BY history_text.rowid DESC LIMIT 1",
+                ('"' + text.replace('"', '""') + '"', before_id, skip)).fetchone()
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self.db.execute("SELECT id, line FROM history WHERE line LIKE ? ESCAPE '\\' AND id < ? AND line IS NOT ? "
+                               "ORDER BY id DESC LIMIT 1", (pattern, before_id, skip)).fetchone()
+
+    def recent_lines(self, limit):
+        # Distinct lines among the last `limit` commands with how often each was run, for completion
+        return self.db.execute("SELECT line, COUNT(*) FROM (SELECT line FROM history ORDER BY id DESC LIMIT ?) GROUP BY line",
+                               (limit,)).fetchall()
+
+    def known_host(self, address):
+        # True if address was seen before; remembers it either way
+        cursor = self.db.execute("INSERT OR IGNORE INTO hosts (address, first_seen) VALUES (?, ?)", (address, time.time()))
+        return cursor.rowcount == 0
+
+    def import_hosts(self, path):
+        # Addresses from the user_ips.txt earlier versions kept in the working directory
+        if self.db.execute("SELECT 1 FROM hosts LIMIT 1").fetchone():
+            return
+        try:
+            with open(path, "r") as file:
+                addresses = [line.strip() for line in file if line.strip()]
+        except OSError:
+            return
+        self.db.executemany("INSERT OR IGNORE INTO hosts (address, first_seen) VALUES (?, ?)",
+                            [(address, time.time()) for address in addresses])
@@ -0,0 +1,123 @@
+import os
+import shutil
+import subprocess
+
+from commands import parse_options
+from config import settings
+from diskusage import usage_task
+
+
+def code_command(term, args):
+    try:
+        term.run_external(["code", term.current_directory])
+    except FileNotFoundError:
+        term.output.write("\nVisual Studio Code is not installed or not found in PATH. Please install it or check your PATH settings.\n")
+        return 1
+
+
+def open_command(term, args):
+    try:
+        subprocess.run(["explorer", term.current_directory], check=True)
+        term.output.write(f"\nOpened directory: {term.current_directory}\n")
+    except Exception as e:
+        term.output.write(f"\nFailed to open directory: {str(e)}. Please check your system settings or permissions.\n")
+        return 1
+
+
+def tasklist_command(term, args):
+    def tasklist_done(returncode):
+        if returncode != 0:
+            term.output.write(f"\nFailed to retrieve task list: exit code {returncode}. Please check your system permissions or configuration.\n")
+    try:
+        term.run_external(["tasklist"], header="\n", on_exit=tasklist_done)
+    except Exception as e:
+        term.output.write(f"\nFailed to retrieve task list: {str(e)}. Please check your system permissions or configuration.\n")
+        return 1
+
+
+def systeminfo_command(term, args):
+    def systeminfo_done(returncode):
+        if returncode != 0:
+            term.output.write(f"\nFailed to retrieve system information: exit code {returncode}. Please check your system permissions or configuration.\n")
+    try:
+        term.run_external(["systeminfo"], header="\n", on_exit=systeminfo_done)
+    except Exception as e:
+        term.output.write(f"\nFailed to retrieve system information: {str(e)}. Please check your system permissions or configuration.\n")
+        return 1
+
+
+def ping_command(term, args):
+    target = args[0]
+    try:
+        term.run_external(["ping", target], header=f"\nPing results for {target}:\n")
+    except Exception as e:
+        term.output.write(f"\nFailed to ping {target}: {str(e)}\n")
+        return 1
+
+
+def ssh_command(term, args):
+    target = args[0]
+    def ssh_done(returncode):
+        if returncode != 0:
+            term.output.write(f"\nSSH connection to {target} failed with error code {returncode}.\n")
+    try:
+        term.run_external(["ssh", target], header=f"\nSSH connection to {target} established:\n", on_exit=ssh_done)
+    except Exception as e:
+        term.output.write(f"\nFailed to establish SSH connection to {target}: {str(e)}\n")
+        return 1
+
+
+def diskusage_command(term, args):
+    # diskusage [path] [--top <n>] [--threads <n>]
+    if not args:
+        try:
+            disk_usage = shutil.disk_usage("/")
+            total, used, free = disk_usage.total, disk_usage.used, disk_usage.free
+            term.output.write(f"\nDisk Usage: Total: {total} bytes, Used: {used} bytes, Free: {free} bytes\n")
+        except Exception as e:
+            term.output.write(f"\nFailed to get disk usage: {str(e)}\n")
+            return 1
+        return
+    try:
+        positional, options = parse_options(args, value_options=("top", "threads"))
+        top = int(options.get("top", [settings['diskusage_top']])[-1])
+        threads = int(options.get("threads", [settings['diskusage_threads']])[-1])
+    except ValueError as e:
+        term.output.write(f"\nFailed to get disk usage: {str(e)}\n")
+        return 1
+    root = os.path.abspath(os.path.join(term.current_directory, os.path.expanduser(positional[0]) if positional else "."))
+    if not os.path.isdir(root):
+        term.output.write(f"\nDirectory not found: {root}. Please check the path and try again.\n")
+        return 1
+    try:
+        term.run_task(usage_task, root, term.usage_cache, threads, top, 0.5,
+                      header=f"\nDisk usage of {root} ({threads} threads):\n")
+    except Exception as e:
+        term.output.write(f"\nFailed to get disk usage: {str(e)}\n")
+        return 1
+
+
+def git_command(term, args):
+    if args[0] != "clone":
+        try:
+            term.run_external(["git"] + args, header="\n")
+        except Exception as e:
+            term.output.write(f"\nError executing git: {str(e)}\n")
+            return 1
+        return
+    try:
+        if len(args) < 2:
+            term.output.write("\nUsage: git clone <repository-url>\n")
+            return 1
+        else:
+            repo_url = args[1]
+            def clone_done(returncode):
+                if returncode == 0:
+                    term.output.write(f"\nSuccessfully cloned {repo_url} into {term.current_directory}\n")
+                else:
+                    term.output.write("\nFailed to clone repository.\n")
+            # --progress keeps git reporting progress even though stderr is a pipe
+            term.run_external(["git", "clone", "--progress", repo_url, term.current_directory], header="\n", on_exit=clone_done)
+    except Exception as e:
+        term.output.write(f"\nError executing git clone: {str(e)}\n")
+        return 1
@@ -0,0 +1,305 @@
+import codecs
+import locale
+import mmap
+import os
+import tkinter as tk
+from tkinter import font as tkfont
+from tkinter import simpledialog
+
+CHECKPOINT_BYTES = 1 << 20  # One line-count checkpoint per MiB of file
+MAX_LINE_CHARS = 4096  # Longer lines are cut when drawn
+HEX_WIDTH = 16
+
+
+def detect_format(sample):
+    # Returns ("text", encoding) or ("binary", None) from the first few KB of a file
+    # UTF-16 is named with its byte order: lines are decoded one at a time and only the first has the BOM
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be")):
+        if sample.startswith(bom):
+            return "text", encoding
+    if b"\0" in sample:
+        return "binary", None
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)  # Tolerates a cut-off last character
+        return "text", "utf-8"
+    except UnicodeDecodeError:
+        pass
+    control = sum(1 for byte in sample if byte < 32 and byte not in (9, 10, 12, 13))
+    if sample and control / len(sample) > 0.1:
+        return "binary", None
+    fallback = locale.getpreferredencoding(False)
+    if codecs.lookup(fallback).name == "utf-8":
+        fallback = "latin-1"  # UTF-8 already failed; latin-1 at least decodes every byte
+    return "text", fallback
+
+
+class MappedFile:
+    # Read-only memory map of a file plus a sparse newline index. Positions are byte offsets, so
+    # paging, scrolling and tailing never need the whole file indexed; only jumping to a line
+    # number counts newlines, and only up to that line. In UTF-16 files a newline is the two-byte
+    # code unit at an even offset; a "\n" byte anywhere else is half of some other character.
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = None
+        self.size = 0
+        self.checkpoints = [0]  # checkpoints[i] = newlines before byte i * CHECKPOINT_BYTES
+        self.refresh()
+        self.kind, self.encoding = detect_format(self.read(0, 8192))
+        self.newline = {"utf-16-le": b"\n\0", "utf-16-be": b"\0\n"}.get(self.encoding, b"\n")
+
+    def refresh(self):
+        # Remap after the file changed size; returns True if it did
+        size = os.fstat(self.file.fileno()).st_size
+        if size == self.size and (self.map is not None or size == 0):
+            return False
+        if size < self.size:
+            self.checkpoints = [0]  # Truncated or rotated: the old newline counts no longer apply
+        else:
+            del self.checkpoints[self.size // CHECKPOINT_BYTES + 1:]  # Drop counts taken from a partial last chunk
+        if self.map is not None:
+            self.map.close()
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.size = size
+        return True
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def read(self, start, end):
+        if self.map is None:
+            return b""
+        return self.map[max(0, start):min(end, self.size)]
+
+    def _find_newline(self, start):
+        # Offset of the first newline at or after start, or -1
+        if self.map is None:
+            return -1
+        found = self.map.find(self.newline, start)
+        while found > 0 and found % len(self.newline):
+            found = self.map.find(self.newline, found + 1)
+        return found
+
+    def _rfind_newline(self, end):
+        # Offset of the last newline that ends at or before end, or -1
+        found = self.map.rfind(self.newline, 0, end)
+        while found > 0 and found % len(self.newline):
+            found = self.map.rfind(self.newline, 0, found + len(self.newline) - 1)
+        return found
+
+    def _count_newlines(self, start, end):
+        data = self.read(start, end)
+        if len(self.newline) == 1:
+            return data.count(b"\n")
+        return data.decode(self.encoding, errors="replace").count("\n")  # start is even, so units line up
+
+    def line_end(self, offset):
+        end = self._find_newline(offset)
+        return self.size if end < 0 else end + len(self.newline)
+
+    def line_start(self, offset):
+        if offset <= 0 or self.map is None:
+            return 0
+        found = self._rfind_newline(min(offset, self.size))
+        return 0 if found < 0 else found + len(self.newline)
+
+    def lines_from(self, offset, count):
+        # Up to count (offset, bytes) lines starting at offset
+        lines = []
+        while offset < self.size and len(lines) < count:
+            end = self.line_end(offset)
+            lines.append((offset, self.read(offset, min(end, offset + MAX_LINE_CHARS * 4))))
+            offset = end
+        return lines
+
+    def forward(self, offset, count):
+        for _ in range(count):
+            end = self.line_end(offset)
+            if end >= self.size:
+                break
+            offset = end
+        return offset
+
+    def back(self, offset, count):
+        offset = self.line_start(min(offset, self.size - 1))  # Offsets at EOF belong to the last line
+        for _ in range(count):
+            if offset == 0:
+                break
+            offset = self.line_start(offset - 1)
+        return offset
+
+    def _extend_checkpoints(self, index):
+        while len(self.checkpoints) <= index and (len(self.checkpoints) - 1) * CHECKPOINT_BYTES < self.size:
+            start = (len(self.checkpoints) - 1) * CHECKPOINT_BYTES
+            self.checkpoints.append(self.checkpoints[-1] + self._count_newlines(start, start + CHECKPOINT_BYTES))
+
+    def line_number(self, offset):
+        # 1-based line number of the line containing offset
+        index = offset // CHECKPOINT_BYTES
+        self._extend_checkpoints(index)
+        index = min(index, len(self.checkpoints) - 1)
+        base = index * CHECKPOINT_BYTES
+        return self.checkpoints[index] + self._count_newlines(base, offset - offset % len(self.newline)) + 1
+
+    def offset_of_line(self, number):
+        # Byte offset where the 1-based line `number` starts (clamped to the last line)
+        wanted = max(0, number - 1)  # Newlines that come before the line
+        if wanted == 0 or self.map is None:
+            return 0
+        index = 0  # Find the chunk holding the wanted newline using the checkpoints
+        while True:
+            self._extend_checkpoints(index + 1)
+            if index + 1 >= len(self.checkpoints) or self.checkpoints[index + 1] >= wanted:
+                break
+            index += 1
+        offset = index * CHECKPOINT_BYTES
+        for _ in range(wanted - self.checkpoints[index]):
+            end = self._find_newline(offset)
+            if end < 0:
+                break
+            offset = end + len(self.newline)
+        if offset >= self.size:
+            return self.line_start(self.size - 1)
+        return offset
+
+    def decode(self, data):
+        text = data.decode(self.encoding, errors="replace").lstrip("\ufeff").rstrip("\r\n")
+        return text if len(text) <= MAX_LINE_CHARS else text[:MAX_LINE_CHARS] + " …"
+
+
+def hex_row(offset, data):
+    hex_part = " ".join(f"{byte:02x}" for byte in data).ljust(HEX_WIDTH * 3 - 1)
+    text_part = "".join(chr(byte) if 32 <= byte < 127 else "." for byte in data)
+    return f"{offset:08x}  {hex_part}  {text_part}"
+
+
+class FileViewer(tk.Toplevel):
+    # Window that shows one screenful of a MappedFile at a time.
+    # Keys: arrows / PgUp / PgDn / Home / End to move, Ctrl-G jump to line, F follow, H hex, Q close.
+    def __init__(self, master, path, bg, fg, font, start_line=None, follow=False, hex_view=False, poll_ms=500):
+        file = MappedFile(path)  # Before the window exists, so a file that can't be opened leaves none behind
+        super().__init__(master)
+        self.file = file
+        self.hex = hex_view or self.file.kind == "binary"
+        self.follow = follow
+        self.poll_ms = poll_ms
+        self.top = 0  # Byte offset of the first visible line (or hex row)
+        self.title(f"Nebula Viewer - {path}")
+        self.geometry("900x600")
+        self.configure(bg=bg)
+        self.text = tk.Text(self, bg=bg, fg=fg, font=font, wrap="none", undo=False)
+        self.line_height = max(1, tkfont.Font(font=self.text["font"]).metrics("linespace"))
+        self.scrollbar = tk.Scrollbar(self, command=self.on_scrollbar)
+        self.status = tk.Label(self, anchor="w", bg=bg, fg=fg, font=font)
+        self.status.pack(side="bottom", fill="x")
+        self.scrollbar.pack(side="right", fill="y")
+        self.text.pack(side="left", expand=True, fill="both")
+        for key, handler in (("<Down>", lambda e: self.move(1)), ("<Up>", lambda e: self.move(-1)),
+                             ("<Next>", lambda e: self.move(self.rows() - 1)), ("<Prior>", lambda e: self.move(1 - self.rows())),
+                             ("<Home>", lambda e: self.go_to(0)), ("<End>", lambda e: self.go_to_end()),
+                             ("<Control-g>", self.ask_line), ("<f>", self.toggle_follow), ("<h>", self.toggle_hex),
+                             ("<q>", lambda e: self.close()), ("<Escape>", lambda e: self.close()),
+                             ("<MouseWheel>", self.on_wheel), ("<Button-4>", lambda e: self.move(-3)), ("<Button-5>", lambda e: self.move(3)),
+                             ("<Configure>", lambda e: self.render())):
+            # Bound on the Text itself so "break" also stops its own scrolling/editing bindings
+            self.text.bind(key, lambda e, handler=handler: handler(e) or "break")
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        if follow:
+            self.go_to_end()
+        elif start_line:
+            self.go_to(self.file.offset_of_line(start_line))
+        self.text.focus_set()
+        self._poll_job = self.after(self.poll_ms, self.poll_file)
+
+    def rows(self):
+        return max(1, self.text.winfo_height() // self.line_height)
+
+    def align(self, offset):
+        offset = min(max(0, offset), max(0, self.file.size - 1))
+        return offset - offset % HEX_WIDTH if self.hex else self.file.line_start(offset)
+
+    def visible(self):
+        if self.hex:
+            rows = []
+            for offset in range(self.top, min(self.file.size, self.top + self.rows() * HEX_WIDTH), HEX_WIDTH):
+                rows.append(hex_row(offset, self.file.read(offset, offset + HEX_WIDTH)))
+            return rows
+        return [self.file.decode(data) for _, data in self.file.lines_from(self.top, self.rows())]
+
+    def render(self):
+        self.text.configure(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(self.visible()))
+        self.text.configure(state="disabled")
+        fraction = self.top / self.file.size if self.file.size else 0.0
+        page = (self.rows() * (HEX_WIDTH if self.hex else 80)) / self.file.size if self.file.size else 1.0
+        self.scrollbar.set(fraction, min(1.0, fraction + page))
+        position = f"offset {self.top:#x}" if self.hex else f"line {self.file.line_number(self.top)}"
+        mode = ("hex" if self.hex else self.file.encoding) + (", following" if self.follow else "")
+        self.status.configure(text=f" {position}  {fraction * 100:.0f}%  {self.file.size} bytes  [{mode}]")
+
+    def move(self, count):
+        if self.hex:
+            self.go_to(self.top + count * HEX_WIDTH)
+        elif count >= 0:
+            self.go_to(self.file.forward(self.top, count))
+        else:
+            self.go_to(self.file.back(self.top, -count))
+
+    def go_to(self, offset):
+        self.top = self.align(offset)
+        self.render()
+
+    def go_to_end(self):
+        if self.hex:
+            self.go_to(self.file.size - self.rows() * HEX_WIDTH)
+        else:
+            self.go_to(self.file.back(self.file.size, self.rows() - 1))
+
+    def ask_line(self, event=None):
+        number = simpledialog.askinteger("Go to line", "Line number:", parent=self, minvalue=1)
+        if number:
+            self.hex = False
+            self.go_to(self.file.offset_of_line(number))
+
+    def toggle_follow(self, event=None):
+        self.follow = not self.follow
+        if self.follow:
+            self.go_to_end()
+        else:
+            self.render()
+
+    def toggle_hex(self, event=None):
+        if self.file.kind == "binary":
+            return  # Binary files can only be shown as hex
+        self.hex = not self.hex
+        self.go_to(self.top)
+
+    def on_wheel(self, event):
+        self.move(-3 if event.delta > 0 else 3)
+
+    def on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.go_to(int(float(value) * self.file.size))
+        elif action == "scroll":
+            self.move(int(value) * (self.rows() - 1 if unit == "pages" else 1))
+
+    def poll_file(self):
+        # Tail/follow: pick up appended data without rereading what was already shown
+        try:
+            if self.file.refresh():
+                if self.follow:
+                    self.go_to_end()
+                else:
+                    self.render()
+        except OSError:
+            pass
+        self._poll_job = self.after(self.poll_ms, self.poll_file)
+
+    def close(self):
+        self.after_cancel(self._poll_job)
+        self.file.close()
+        self.destroy()
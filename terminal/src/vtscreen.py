@@ -0,0 +1,413 @@
+import re
+import threading
+from collections import deque
+
+from highlight import AnsiDecoder
+
+# One token per match: a run of plain lines, a run of printable text, a CSI sequence, an OSC string, a DCS/PM/APC string,
+# a two-character escape, a single control character, or an ESC whose sequence isn't complete yet
+TOKEN = re.compile(
+    r"(?P<lines>(?:[^\x00-\x1f\x7f-\x9f]*\r\n){4,})"
+    r"|(?P<text>[^\x00-\x1f\x7f-\x9f]+)"
+    r"|(?P<csi>\x1b\[[0-?]*[ -/]*[@-~])"
+    r"|(?P<osc>\x1b\][^\x07\x1b]*(?:\x07|\x1b\\))"
+    r"|(?P<string>\x1b[PX^_][^\x1b]*\x1b\\)"
+    r"|(?P<esc>\x1b[ -/]*[0-Z\\^-~])"
+    r"|(?P<control>[\x00-\x1a\x1c-\x1f\x7f-\x9f])"
+    r"|(?P<partial>\x1b)")
+MAX_PARTIAL = 256  # An ESC this close to the end of a read is kept for the next read
+# DEC special graphics (ESC ( 0), used for line drawing by curses programs
+DEC_GRAPHICS = str.maketrans("`afgjklmnopqrstuvwxyz{|}~", "◆▒°±┘┐┌└┼⎺⎻─⎼⎽├┤┴┬│≤≥π≠£·")
+
+
+def row_pieces(chars, tags):
+    # [(text, tags)] for one screen row, trailing blanks dropped. tags is None for a plain row.
+    if tags is None:
+        text = (chars if isinstance(chars, str) else "".join(chars)).rstrip(" ")
+        return [(text, ())] if text else []
+    end = len(chars)
+    while end and chars[end - 1] == " " and not tags[end - 1]:
+        end -= 1
+    pieces = []
+    start = 0
+    for x in range(1, end + 1):
+        if x == end or tags[x] != tags[start]:
+            pieces.append(("".join(chars[start:x]), tags[start]))
+            start = x
+    return pieces
+
+
+class Screen:
+    # Cell grid of a VT100/xterm screen fed with a program's output. Rows that changed since the
+    # last take_damage() are tracked, and rows scrolled off the top of the main screen are kept
+    # for the scrollback. Feeding happens on the reader thread, so readers take `lock` first.
+    # Each character is one cell; wide (CJK) characters and combining marks are not special-cased.
+    def __init__(self, rows=24, cols=80):
+        self.lock = threading.Lock()
+        self.rows = max(1, rows)
+        self.cols = max(2, cols)
+        self.scrolled = deque()  # (text, tags or None) rows that left the top of the main screen
+        self.replies = []  # Answers to status queries, for the runner to write back to the program
+        self.title = ""
+        self.carry = ""
+        self.reset()
+
+    def reset(self):
+        self.sgr = AnsiDecoder()  # Holds the current colours; apply() parses SGR parameters
+        self.cell_tags = ()
+        self.chars, self.tags = self._blank_grid(self.rows)
+        self.saved_grid = None  # Main screen while the alternate screen is shown
+        self.x = self.y = 0
+        self.top, self.bottom = 0, self.rows - 1  # Scroll region
+        self.wrap_pending = False
+        self.autowrap = True
+        self.cursor_visible = True
+        self.app_cursor = False
+        self.graphics = False
+        self.saved_cursor = (0, 0, (), False)
+        self.damage = set(range(self.rows))
+
+    def _blank_grid(self, count):
+        return [[" "] * self.cols for _ in range(count)], [[()] * self.cols for _ in range(count)]
+
+    @property
+    def alternate(self):
+        return self.saved_grid is not None
+
+    def feed(self, text):
+        if self.carry:
+            text = self.carry + text
+            self.carry = ""
+        for match in TOKEN.finditer(text):
+            kind = match.lastgroup
+            token = match.group()
+            if kind == "lines":
+                self.write_lines(token.split("\r\n")[:-1])
+            elif kind == "text":
+                self.write_text(token.translate(DEC_GRAPHICS) if self.graphics else token)
+            elif kind == "control":
+                self.control(token)
+            elif kind == "csi":
+                self.csi(token[2:-1], token[-1])
+            elif kind == "esc":
+                self.escape(token[1:])
+            elif kind == "osc":
+                number, _, value = token[2:].rstrip("\x07\\").rstrip("\x1b").partition(";")
+                if number in ("0", "2"):
+                    self.title = value
+            elif kind == "partial" and match.start() >= len(text) - MAX_PARTIAL:
+                self.carry = text[match.start():]
+                break
+
+    def write_text(self, text):
+        tags = self.cell_tags
+        while text:
+            if self.wrap_pending:
+                self.wrap_pending = False
+                self.x = 0
+                self.linefeed()
+            x, row = self.x, self.y
+            piece = text[:self.cols - x]
+            text = text[len(piece):]
+            end = x + len(piece)
+            self.chars[row][x:end] = piece
+            self.tags[row][x:end] = [tags] * len(piece)
+            self.damage.add(row)
+            if end < self.cols:
+                self.x = end
+            elif self.autowrap:
+                self.x = self.cols - 1
+                self.wrap_pending = True
+            else:
+                self.x = self.cols - 1
+                if text:  # Without autowrap the rest overwrites the last column
+                    self.chars[row][-1] = text[-1]
+                    self.tags[row][-1] = tags
+                return
+
+    def write_lines(self, lines):
+        # Many plain "text\r\n" lines in a row: the bulk of cat and log output. Once the cursor is on
+        # the bottom row of an ordinary scrolling screen, each line just pushes one row off the top,
+        # so the grid is rebuilt once instead of being scrolled line by line.
+        index = 0
+        while index < len(lines) and (index == 0 or self.y != self.bottom or self.chars[self.y].count(" ") != self.cols
+                                      or any(self.tags[self.y])):
+            self.write_text(lines[index])
+            self.control("\r")
+            self.linefeed()
+            index += 1
+        lines = lines[index:]
+        if not lines:
+            return
+        cols = self.cols
+        wrapped = max(map(len, lines)) > cols
+        if (self.cell_tags or self.graphics or self.top or self.bottom != self.rows - 1 or self.saved_grid is not None
+                or (wrapped and not self.autowrap)):
+            for line in lines:
+                self.write_text(line)
+                self.control("\r")
+                self.linefeed()
+            return
+        if wrapped:
+            lines = [line[start:start + cols] for line in lines for start in range(0, len(line) or 1, cols)]
+        # The bottom row is blank now; every row of text takes it and scrolls once
+        kept = list(zip(self.chars[:-1], self.tags[:-1]))
+        pushed = len(lines)
+        if pushed >= len(kept):
+            self.scrolled.extend(("".join(chars), tags if any(tags) else None) for chars, tags in kept)
+            self.scrolled.extend((line, None) for line in lines[:pushed - len(kept)])
+            lines = lines[pushed - len(kept):]
+            kept = []
+        else:
+            self.scrolled.extend(("".join(chars), tags if any(tags) else None) for chars, tags in kept[:pushed])
+            kept = kept[pushed:]
+        rows = kept + [(list(line.ljust(cols)), [()] * cols) for line in lines] + [([" "] * cols, [()] * cols)]
+        self.chars = [chars for chars, _ in rows]
+        self.tags = [tags for _, tags in rows]
+        self.x, self.y = 0, self.bottom
+        self.wrap_pending = False
+        self.damage.update(range(self.rows))
+
+    def control(self, char):
+        if char == "\r":
+            self.x = 0
+        elif char in "\n\x0b\x0c":
+            self.linefeed()
+        elif char == "\x08":
+            self.x = max(0, self.x - 1)
+        elif char == "\t":
+            self.x = min(self.cols - 1, (self.x // 8 + 1) * 8)
+        elif char == "\x0e":
+            self.graphics = True
+        elif char == "\x0f":
+            self.graphics = False
+        else:
+            return  # Bell and the rest
+        self.wrap_pending = False
+
+    def linefeed(self):
+        if self.y == self.bottom:
+            self.scroll_up(1)
+        elif self.y < self.rows - 1:
+            self.y += 1
+
+    def scroll_up(self, count):
+        count = min(count, self.bottom - self.top + 1)
+        keep = self.top == 0 and self.saved_grid is None  # Only the main screen's full-width scrolling feeds the scrollback
+        for _ in range(count):
+            old_chars, old_tags = self.chars.pop(self.top), self.tags.pop(self.top)
+            if keep:
+                # Kept as a string (and no tag list for a plain row): millions of these may pile up
+                self.scrolled.append(("".join(old_chars), old_tags if any(old_tags) else None))
+            self.chars.insert(self.bottom, [" "] * self.cols)
+            self.tags.insert(self.bottom, [()] * self.cols)
+        self.damage.update(range(self.top, self.bottom + 1))
+
+    def scroll_down(self, count):
+        count = min(count, self.bottom - self.top + 1)
+        chars, tags = self._blank_grid(count)
+        for i in range(count):
+            del self.chars[self.bottom], self.tags[self.bottom]
+            self.chars.insert(self.top, chars[i])
+            self.tags.insert(self.top, tags[i])
+        self.damage.update(range(self.top, self.bottom + 1))
+
+    def erase(self, row, start, end):
+        self.chars[row][start:end] = [" "] * (end - start)
+        self.tags[row][start:end] = [()] * (end - start)
+        self.damage.add(row)
+
+    def move(self, y=None, x=None):
+        if y is not None:
+            self.y = min(self.rows - 1, max(0, y))
+        if x is not None:
+            self.x = min(self.cols - 1, max(0, x))
+        self.wrap_pending = False
+
+    def escape(self, sequence):
+        if sequence == "7":
+            self.saved_cursor = (self.x, self.y, self.cell_tags, self.graphics)
+        elif sequence == "8":
+            x, y, self.cell_tags, self.graphics = self.saved_cursor
+            self.move(y, x)
+        elif sequence == "D":
+            self.linefeed()
+        elif sequence == "E":
+            self.x = 0
+            self.linefeed()
+        elif sequence == "M":
+            if self.y == self.top:
+                self.scroll_down(1)
+            else:
+                self.move(self.y - 1)
+        elif sequence == "c":
+            self.reset()
+        elif sequence[0] == "(":
+            self.graphics = sequence[1:] == "0"
+
+    def csi(self, body, final):
+        private = body[:1] in ("?", ">", "<", "=")
+        params = body.lstrip("?><=").rstrip(" !\"#$%&'()*+,-./")
+        args = [int(value) if value.isdigit() else 0 for value in params.split(";")] if params else []
+
+        def arg(index=0, default=1):
+            return args[index] if index < len(args) and args[index] else default
+
+        if final == "m":
+            if not private:
+                self.sgr.apply(params)
+                self.cell_tags = self.sgr.tags()
+        elif final in "Hf":
+            self.move(arg(0) - 1, arg(1) - 1)
+        elif final == "A":
+            self.move(self.y - arg())
+        elif final in "Be":
+            self.move(self.y + arg())
+        elif final in "Ca":
+            self.move(x=self.x + arg())
+        elif final == "D":
+            self.move(x=self.x - arg())
+        elif final == "E":
+            self.move(self.y + arg(), 0)
+        elif final == "F":
+            self.move(self.y - arg(), 0)
+        elif final in "G`":
+            self.move(x=arg() - 1)
+        elif final == "d":
+            self.move(arg() - 1)
+        elif final == "J":
+            mode = arg(0, 0)
+            if mode == 0:
+                self.erase(self.y, self.x, self.cols)
+                rows = range(self.y + 1, self.rows)
+            elif mode == 1:
+                self.erase(self.y, 0, self.x + 1)
+                rows = range(self.y)
+            else:
+                rows = range(self.rows)
+            for row in rows:
+                self.erase(row, 0, self.cols)
+        elif final == "K":
+            mode = arg(0, 0)
+            start, end = (self.x, self.cols) if mode == 0 else ((0, self.x + 1) if mode == 1 else (0, self.cols))
+            self.erase(self.y, start, end)
+        elif final == "X":
+            self.erase(self.y, self.x, min(self.cols, self.x + arg()))
+        elif final in "LM":
+            if self.top <= self.y <= self.bottom:
+                top, self.top = self.top, self.y
+                (self.scroll_down if final == "L" else self.scroll_up)(arg())
+                self.top = top
+                self.x = 0
+        elif final in "P@":
+            row, count = self.y, min(arg(), self.cols - self.x)
+            chars, tags = self.chars[row], self.tags[row]
+            if final == "P":
+                chars[self.x:] = chars[self.x + count:] + [" "] * count
+                tags[self.x:] = tags[self.x + count:] + [()] * count
+            else:
+                chars[self.x:] = ([" "] * count + chars[self.x:])[:self.cols - self.x]
+                tags[self.x:] = ([()] * count + tags[self.x:])[:self.cols - self.x]
+            self.damage.add(row)
+        elif final == "S" and not private:
+            self.scroll_up(arg())
+        elif final == "T" and not private:
+            self.scroll_down(arg())
+        elif final == "r" and not private:
+            top, bottom = arg(0) - 1, arg(1, self.rows) - 1
+            if 0 <= top < bottom < self.rows:
+                self.top, self.bottom = top, bottom
+                self.move(0, 0)
+        elif final == "s" and not private:
+            self.escape("7")
+        elif final == "u" and not private:
+            self.escape("8")
+        elif final in "hl" and private:
+            for mode in args:
+                self.set_mode(mode, final == "h")
+        elif final == "n" and not private:
+            if arg(0, 0) == 6:
+                self.replies.append(f"\x1b[{self.y + 1};{self.x + 1}R")
+            elif arg(0, 0) == 5:
+                self.replies.append("\x1b[0n")
+        elif final == "c":
+            if body.startswith(">"):
+                self.replies.append("\x1b[>0;0;0c")
+            elif not private:
+                self.replies.append("\x1b[?1;2c")  # VT100 with advanced video
+
+    def set_mode(self, mode, enabled):
+        if mode == 1:
+            self.app_cursor = enabled
+        elif mode == 7:
+            self.autowrap = enabled
+        elif mode == 25:
+            self.cursor_visible = enabled
+        elif mode in (47, 1047, 1049):
+            if enabled == self.alternate:
+                return
+            if mode == 1049 and enabled:
+                self.escape("7")
+            if enabled:
+                self.saved_grid = (self.chars, self.tags)
+                self.chars, self.tags = self._blank_grid(self.rows)
+            else:
+                self.chars, self.tags = self.saved_grid
+                self.saved_grid = None
+            if mode == 1049 and not enabled:
+                self.escape("8")
+            self.damage.update(range(self.rows))
+        elif mode == 1048:
+            self.escape("7" if enabled else "8")
+
+    def resize(self, rows, cols):
+        rows, cols = max(1, rows), max(2, cols)
+        grids = [(self.chars, self.tags)] + ([self.saved_grid] if self.saved_grid else [])
+        for index, (chars, tags) in enumerate(grids):
+            for row_chars, row_tags in zip(chars, tags):
+                del row_chars[cols:], row_tags[cols:]
+                row_chars.extend([" "] * (cols - len(row_chars)))
+                row_tags.extend([()] * (cols - len(row_tags)))
+            # Rows above the cursor go first when the screen gets shorter, so the cursor stays visible
+            excess = len(chars) - rows
+            if excess > 0:
+                cut = min(excess, self.y) if index == 0 else excess
+                if index == 0 and not self.alternate:
+                    self.scrolled.extend(("".join(row_chars), row_tags) for row_chars, row_tags in zip(chars[:cut], tags[:cut]))
+                del chars[:cut], tags[:cut]
+                del chars[rows:], tags[rows:]
+                if index == 0:
+                    self.y -= cut
+            while len(chars) < rows:
+                chars.append([" "] * cols)
+                tags.append([()] * cols)
+        self.rows, self.cols = rows, cols
+        self.top, self.bottom = 0, rows - 1
+        self.move(self.y, self.x)
+        self.damage = set(range(rows))
+
+    # Readers; call with the lock held
+    def take_damage(self, everything=False):
+        rows = range(self.rows) if everything else sorted(self.damage)
+        self.damage = set()
+        return {row: row_pieces(self.chars[row], self.tags[row]) for row in rows}
+
+    def take_scrolled(self):
+        scrolled, self.scrolled = self.scrolled, deque()
+        return [row_pieces(chars, tags) for chars, tags in scrolled]
+
+    def take_text(self, final=False):
+        # Scrolled-off lines as [(text, tags)] pieces, plus with final the screen down to its last
+        # non-blank row; for frontends that print lines instead of drawing the screen
+        lines = self.take_scrolled()
+        if final:
+            rows = [row_pieces(self.chars[row], self.tags[row]) for row in range(self.rows)]
+            while rows and not rows[-1]:
+                rows.pop()
+            lines.extend(rows)
+        self.damage = set()
+        pieces = []
+        for line in lines:
+            pieces.extend(line)
+            pieces.append(("\n", ()))
+        return pieces
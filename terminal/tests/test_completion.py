@@ -0,0 +1,69 @@
+import os
+import random
+
+from completion import CompletionEngine, PrefixTrie
+from dircache import DirectoryCache
+
+
+def brute_force(weights, prefix, keep):
+    ranked = sorted(((weight, word) for word, weight in weights.items() if word.startswith(prefix)),
+                    key=lambda item: (-item[0], item[1]))
+    return [word for _, word in ranked[:keep]]
+
+
+def test_complete_ranks_by_weight_then_name():
+    trie = PrefixTrie(keep=3)
+    for word in ["diff", "dir", "diskusage", "date"]:
+        trie.add(word)
+    trie.add("diskusage", 2)
+    assert trie.complete("di") == ["diskusage", "diff", "dir"]
+    assert trie.complete("d", limit=2) == ["diskusage", "date"]
+    assert trie.complete("x") == []
+    assert len(trie) == 4
+
+
+def test_remove_refills_the_lists_on_its_path():
+    trie = PrefixTrie(keep=2)
+    for word, weight in [("git", 5), ("go", 4), ("grep", 3), ("gzip", 1)]:
+        trie.add(word, weight)
+    assert trie.complete("g") == ["git", "go"]
+    assert trie.remove("git")
+    assert not trie.remove("git")
+    assert trie.complete("g") == ["go", "grep"]
+    assert trie.complete("gi") == []
+    assert "i" not in trie.root["g"]  # Nodes only git used are gone
+
+
+def test_add_and_remove_match_a_full_scan():
+    rng = random.Random(3)
+    trie = PrefixTrie(keep=5)
+    weights = {}
+    for _ in range(2000):
+        word = "".join(rng.choice("abc") for _ in range(rng.randint(0, 5)))
+        if word in weights and rng.random() < 0.4:
+            trie.remove(word)
+            del weights[word]
+        else:
+            weight = rng.randint(1, 3)
+            trie.add(word, weight)
+            weights[word] = weights.get(word, 0) + weight
+        prefix = word[:rng.randint(0, len(word))]
+        assert trie.complete(prefix) == brute_force(weights, prefix, 5)
+
+
+def test_command_completion_adds_history_after_commands(tmp_path):
+    engine = CompletionEngine(DirectoryCache())
+    engine.set_commands(["diff", "dir"])
+    engine.load_history([("dir projects", 3)])
+    engine.record("diff a b")
+    assert engine.complete_command("di", 3) == ["diff", "dir", "dir projects"]
+
+
+def test_match_paths_completes_from_the_directory_cache(tmp_path):
+    (tmp_path / "notes.txt").write_text("")
+    (tmp_path / "notebooks").mkdir()
+    engine = CompletionEngine(DirectoryCache())
+    matches, total = engine.match_paths("note", str(tmp_path), 10)
+    assert total == 2
+    assert sorted(matches) == ["notebooks" + os.sep, "notes.txt"]
+    assert engine.match_paths("*.txt", str(tmp_path), 10) == (["notes.txt"], 1)
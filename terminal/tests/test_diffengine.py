@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from diffengine import matching_runs, opcodes
+
+
+def apply_opcodes(a, b, codes):
+    # Rebuild b from a and the opcodes, checking that equal regions really are equal
+    result = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            result.extend(a[i1:i2])
+        else:
+            result.extend(b[j1:j2])
+    return result
+
+
+@pytest.mark.parametrize("max_cost", [0, 1, 2, 256])
+def test_small_max_cost_terminates_with_a_valid_diff(max_cost):
+    rng = random.Random(max_cost)
+    for _ in range(300):
+        a = [rng.randint(0, 4) for _ in range(rng.randint(0, 40))]
+        b = [rng.randint(0, 4) for _ in range(rng.randint(0, 40))]
+        runs = list(matching_runs(a, b, max_cost))
+        assert runs[-1] == (len(a), len(b), 0)
+        assert apply_opcodes(a, b, opcodes(runs)) == b
+
+
+def test_max_cost_zero_is_unlimited():
+    a = list(range(200))
+    b = [value for value in a if value % 7]
+    runs = list(matching_runs(a, b, 0))
+    assert sum(size for _, _, size in runs) == len(b)  # Minimal: every line of b is matched
@@ -0,0 +1,62 @@
+import os
+
+from diskusage import DirectoryUsage, UsageCache, UsageScan, format_size
+
+
+def scan(root, cache):
+    usage = UsageScan(str(root), cache, workers=4)
+    usage.run()
+    assert usage.done.wait(10)
+    return usage
+
+
+def make_tree(root):
+    (root / "a").mkdir()
+    (root / "a" / "deep").mkdir()
+    (root / "b").mkdir()
+    (root / "a" / "deep" / "big.bin").write_bytes(b"x" * 200000)
+    (root / "b" / "small.txt").write_bytes(b"x" * 100)
+    (root / "top.txt").write_bytes(b"x" * 5000)
+
+
+def test_cache_entries_are_only_valid_for_the_same_mtime():
+    cache = UsageCache(max_entries=2)
+    usage = DirectoryUsage(1, 10, 1, [], [])
+    cache.put("/x", usage)
+    assert cache.get("/x", 1) is usage
+    assert cache.get("/x", 2) is None
+    cache.put("/y", usage)
+    cache.put("/z", usage)
+    assert cache.get("/x", 1) is None  # Least recently used entry went first
+
+
+def test_scan_totals_and_largest_entries(tmp_path):
+    make_tree(tmp_path)
+    usage = scan(tmp_path, UsageCache())
+    assert (usage.dirs, usage.files, usage.cached) == (4, 3, 0)
+    assert usage.bytes == usage.total(str(tmp_path))
+    entries = usage.top_entries(3)
+    assert [name for _, name, _ in entries][0] == "a"
+    assert {(name, is_dir) for _, name, is_dir in entries} == {("a", True), ("b", True), ("top.txt", False)}
+    assert usage.total(str(tmp_path / "a")) >= 200000
+
+
+def test_repeat_scan_only_rescans_changed_directories(tmp_path):
+    make_tree(tmp_path)
+    cache = UsageCache()
+    first = scan(tmp_path, cache)
+    second = scan(tmp_path, cache)
+    assert (second.cached, second.bytes) == (4, first.bytes)
+    (tmp_path / "b" / "new.txt").write_bytes(b"x" * 100000)
+    stat = os.stat(tmp_path / "b")
+    os.utime(tmp_path / "b", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))  # In case the clock is coarse
+    third = scan(tmp_path, cache)
+    assert third.cached == 3  # Everything but b
+    assert third.files == 4
+    assert third.total(str(tmp_path / "b")) >= 100000
+
+
+def test_format_size():
+    assert format_size(512) == "512 B"
+    assert format_size(2048) == "2.0 KB"
+    assert format_size(5 * 1024 ** 3) == "5.0 GB"
@@ -0,0 +1,22 @@
+from executor import BackgroundTask, EventSource, ProcessRunner, PtyRunner
+
+
+def test_runners_share_read_events():
+    assert all(cls.read_events is EventSource.read_events for cls in (ProcessRunner, BackgroundTask, PtyRunner))
+
+
+def test_read_events_honours_limit_and_wait():
+    def target(task):
+        for n in range(5):
+            task.write(f"{n}\n")
+        return 3
+
+    task = BackgroundTask(target).start()
+    events = []
+    while not events or events[-1][0] != "exit":
+        batch = task.read_events(limit=2, wait=1.0)
+        assert 0 < len(batch) <= 2
+        events.extend(batch)
+    assert [data for kind, data in events if kind == "write"] == [(f"{n}\n", None) for n in range(5)]
+    assert events[-1] == ("exit", 3)
+    assert task.read_events(wait=0.01) == []
@@ -0,0 +1,50 @@
+import difflib
+import random
+import string
+
+import pytest
+
+from fuzzy import FuzzyIndex, edit_distance
+
+COMMANDS = ["help", "date", "exit", "go", "cls", "clear", "jobs", "fg", "kill", "dir", "edit", "mkdir", "open",
+            "openfile", "rename", "diff", "code", "echo", "stats", "filter", "settings", "tasklist", "systeminfo",
+            "diskusage", "issue", "ping", "ssh", "listports", "git"]
+
+
+def test_edit_distance_counts_transpositions_and_stops_at_limit():
+    assert edit_distance("hlep", "help", 2) == 1
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("kitten", "sitting", 2) == 3  # limit + 1 once it is known to be over the limit
+    assert edit_distance("a", "abcdef", 2) == 3
+
+
+@pytest.mark.parametrize("typo", ["lsitports", "dif", "hlep", "settigns", "fitler", "clera", "diskusge", "ech",
+                                  "jbos", "kil", "stast", "edti", "gti"])
+def test_best_suggestion_matches_difflib(typo):
+    expected = difflib.get_close_matches(typo, COMMANDS, n=1, cutoff=0.6)
+    assert [word for _, word in FuzzyIndex(COMMANDS).search(typo, k=1, cutoff=0.6)] == expected
+
+
+def test_cutoff_and_ranking():
+    index = FuzzyIndex(COMMANDS)
+    results = index.search("dif", k=3, cutoff=0.6)
+    assert [word for _, word in results] == ["diff", "dir"]
+    assert all(score >= 0.6 for score, _ in results)
+    assert index.search("dif", k=3, cutoff=0.7) == [(0.75, "diff")]
+    assert index.search("histroy", cutoff=0.6) == []
+    assert index.search("ECHO", cutoff=1.0) == [(1.0, "echo")]
+
+
+def test_large_index_finds_the_same_best_match_as_a_full_scan():
+    # Typos that break every rare trigram of a word must still reach it through the common ones
+    rng = random.Random(1)
+    stems = ["report", "invoice", "backup", "config", "photo", "notes", "draft", "summary", "budget", "scan"]
+    words = sorted({f"{rng.choice(stems)}_{rng.randint(0, 9999)}{rng.choice(['.txt', '.pdf', ''])}" for _ in range(3000)})
+    index = FuzzyIndex(words)
+    for _ in range(100):
+        word = rng.choice(words)
+        i = rng.randrange(len(word))
+        typo = word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+        best = min(edit_distance(typo, candidate, 2) for candidate in words)  # At most 1: word itself is there
+        (score, found), = index.search(typo, k=1, cutoff=0.7)
+        assert edit_distance(typo, found, 2) == best
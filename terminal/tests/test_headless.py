@@ -0,0 +1,49 @@
+import io
+import shutil
+import time
+
+import pytest
+
+import headless
+from session import Session
+
+
+def test_successful_commands_exit_zero(tmp_path, capsys):
+    assert headless.main(["--cwd", str(tmp_path), "-c", "echo hello"]) == 0
+    assert "hello" in capsys.readouterr().out
+
+
+def test_failing_builtin_gives_nonzero_exit(tmp_path, capsys):
+    assert headless.main(["--cwd", str(tmp_path), "-c", "edit missing.txt"]) == 1
+    assert "File not found" in capsys.readouterr().out
+
+
+@pytest.mark.skipif(shutil.which("cat") is None, reason="needs a cat program")
+def test_failing_program_gives_nonzero_exit(tmp_path, capsys):
+    assert headless.main(["--cwd", str(tmp_path), "-c", "cat missing"]) == 1
+
+
+def test_stop_on_error_skips_the_rest(tmp_path, capsys):
+    code = headless.main(["--cwd", str(tmp_path), "--stop-on-error", "-c", "go nowhere", "-c", "echo after"])
+    assert code == 1
+    assert "after" not in capsys.readouterr().out
+
+
+@pytest.mark.skipif(shutil.which("sleep") is None, reason="needs a sleep program")
+def test_trailing_ampersand_runs_a_program_as_a_job(tmp_path):
+    output = headless.StreamOutput(io.StringIO())
+    session = Session(output, current_directory=str(tmp_path))
+    started = time.perf_counter()
+    assert session.run("sleep 0.5 &") is None
+    assert time.perf_counter() - started < 0.4
+    job = session.jobs.find()
+    assert job.line == "sleep 0.5" and job.state == "running"
+    while session.jobs.pump():
+        time.sleep(0.02)
+    assert job.state == "done" and job.returncode == 0
+
+
+def test_filter_without_a_pattern_is_a_usage_error(tmp_path, capsys):
+    assert headless.main(["--cwd", str(tmp_path), "-c", "echo hello", "-c", "filter --regex"]) == 1
+    out = capsys.readouterr().out
+    assert "Usage: filter <pattern>" in out and "matches on" not in out
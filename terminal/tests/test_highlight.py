@@ -0,0 +1,34 @@
+from highlight import AnsiDecoder
+
+
+def text_of(pieces):
+    return "".join(text for text, _ in pieces)
+
+
+def test_sequence_split_across_reads_is_carried():
+    decoder = AnsiDecoder()
+    assert text_of(decoder.feed("red: \x1b[3")) == "red: "
+    pieces = decoder.feed("1mtext")
+    assert pieces == [("text", ("ansi-fg-cd3131",))]
+    assert decoder.carry == ""
+
+
+def test_osc_string_split_across_reads_is_carried():
+    decoder = AnsiDecoder()
+    assert text_of(decoder.feed("a\x1b]0;title\x1b")) == "a"
+    assert text_of(decoder.feed("\\b")) == "b"
+
+
+def test_complete_unrecognised_escape_is_not_carried():
+    decoder = AnsiDecoder()
+    assert text_of(decoder.feed("done\x1b(B")) == "done(B"
+    assert decoder.carry == ""
+    assert not decoder.active()
+
+
+def test_finish_flushes_the_carry_as_text():
+    decoder = AnsiDecoder()
+    assert text_of(decoder.feed("progress \x1b[12")) == "progress "
+    assert text_of(decoder.finish()) == "[12"
+    assert decoder.carry == ""
+    assert decoder.finish() == []
@@ -0,0 +1,16 @@
+from jobs import JobOutput
+
+
+def test_line_count_follows_dropped_output():
+    output = JobOutput(max_chars=10)
+    for _ in range(20):
+        output.write("line\n")
+    assert output.lines == sum(text.count("\n") for text, _ in output.pieces) == 2
+    assert output.dropped == 90
+
+
+def test_line_count_resets_on_clear():
+    output = JobOutput(max_chars=100)
+    output.write("a\nb\n")
+    output.clear()
+    assert output.lines == 0
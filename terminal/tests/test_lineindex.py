@@ -0,0 +1,56 @@
+import re
+
+import pytest
+
+import lineindex
+from lineindex import LineIndex
+
+
+@pytest.fixture
+def index(monkeypatch):
+    monkeypatch.setattr(lineindex, "BLOCK_LINES", 4)  # Several blocks even for a few lines
+    index = LineIndex()
+    index.append_text("".join(f"line {n}{' ERROR' if n % 5 == 0 else ''}\n" for n in range(1, 21)))
+    return index
+
+
+def test_search_finds_matches_across_blocks(index):
+    assert len(index.blocks) > 3
+    assert [line for line, _, _ in index.search("error")] == [5, 10, 15, 20]
+    assert index.search("ERROR", limit=2) == [(5, 7, 12), (10, 8, 13)]
+    assert index.search("Error") == []  # A capital letter makes the query case-sensitive
+    assert [line for line, _, _ in index.search(r"line 1\d$", regex=True)] == [11, 12, 13, 14, 16, 17, 18, 19]
+    with pytest.raises(re.error):
+        index.search("(", regex=True)
+
+
+def test_search_after_trim_keeps_or_renumbers_lines(index):
+    index.trim(7, renumber=False)
+    assert index.first_line == 8
+    assert [line for line, _, _ in index.search("error")] == [10, 15, 20]
+    assert index.line(10) == "line 10 ERROR"
+    index.trim(3)  # Renumbered: the lines after the trim move down by 3, as in the Text widget
+    assert index.first_line == 8 and index.trimmed == 10
+    assert [line for line, _, _ in index.search("error")] == [12, 17]
+    assert index.line(12) == "line 15 ERROR"
+
+
+def test_search_after_renumbering_trim_follows_widget_numbers():
+    index = LineIndex()
+    index.extend(["a", "needle", "b", "needle"])
+    index.trim(2)
+    assert index.search("needle") == [(2, 0, 6)]
+    assert index.line(1) == "b"
+
+
+def test_appended_text_continues_the_last_line_and_is_searchable():
+    index = LineIndex()
+    index.append_text("par")
+    assert index.search("partial") == []
+    index.append_text("tial\nnext")
+    assert index.search("partial") == [(1, 0, 7)]
+    index.replace_from(2, ["replaced"])
+    assert index.search("next") == [] and index.line(2) == "replaced"
+    version = index.version
+    index.clear()
+    assert len(index) == 0 and index.version > version
@@ -0,0 +1,46 @@
+import io
+import json
+import random
+
+import pytest
+
+from config import settings
+from headless import StreamOutput
+from metrics import Histogram
+from session import Session
+
+
+def test_trace_file_records_commands_without_instrumentation(tmp_path, monkeypatch):
+    path = tmp_path / "trace.json"
+    monkeypatch.setitem(settings, "instrumentation", False)
+    monkeypatch.setitem(settings, "trace_file", str(path))
+    session = Session(StreamOutput(io.StringIO()), current_directory=str(tmp_path))
+    session.run("help")
+    session.metrics.stop_trace()
+    session.metrics.disable()
+    events = json.loads(path.read_text())
+    assert any(event.get("name") == "help" for event in events)
+
+
+def test_histogram_percentiles_are_within_a_bucket_of_the_true_value():
+    rng = random.Random(5)
+    samples = [rng.lognormvariate(-6, 1.5) for _ in range(5000)]
+    histogram = Histogram()
+    for seconds in samples:
+        histogram.add(seconds)
+    samples.sort()
+    for p in (50, 95, 99):
+        true = samples[max(0, -(-p * len(samples) // 100) - 1)]
+        assert true <= histogram.percentile(p) <= true * 2 ** (1 / 8) + 1e-12
+    assert histogram.percentile(100) == histogram.max == samples[-1]
+    assert histogram.count == 5000 and histogram.total == pytest.approx(sum(samples))
+
+
+def test_histogram_edge_cases():
+    histogram = Histogram()
+    assert histogram.percentile(50) == 0.0
+    histogram.add(0.0)
+    histogram.add(3e-7)  # Under a microsecond: the first bucket
+    assert histogram.percentile(100) == 3e-7
+    histogram.add(0.25)
+    assert histogram.percentile(50) == 1e-6 and histogram.percentile(99) == 0.25
@@ -0,0 +1,49 @@
+import io
+import socket
+
+import pytest
+
+import portscan
+from headless import StreamOutput
+from session import Session
+
+
+def test_resolve_host_prefers_ipv4(monkeypatch):
+    results = [(socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", 0, 0, 0)),
+               (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 0))]
+    monkeypatch.setattr(socket, "getaddrinfo", lambda *args, **kwargs: results)
+    assert portscan.resolve_host("localhost") == "127.0.0.1"
+
+
+def test_resolve_host_falls_back_to_ipv6(monkeypatch):
+    results = [(socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", 0, 0, 0))]
+    monkeypatch.setattr(socket, "getaddrinfo", lambda *args, **kwargs: results)
+    assert portscan.resolve_host("ip6-localhost") == "::1"
+
+
+def test_scan_finds_ipv4_listener_on_localhost():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        port = server.getsockname()[1]
+        assert portscan.scan_ports("localhost", [port], timeout=2) == [port]
+
+
+@pytest.mark.parametrize("timeout", ["0", "-1"])
+def test_listports_rejects_timeouts_that_are_not_positive(tmp_path, timeout):
+    session = Session(StreamOutput(io.StringIO()), current_directory=str(tmp_path))
+    assert session.execute("listports", ["127.0.0.1", "1", "--timeout", timeout]) == 2
+    assert session.active_task is None
+
+
+def test_listports_clamps_concurrency_to_one(tmp_path):
+    stream = io.StringIO()
+    session = Session(StreamOutput(stream), current_directory=str(tmp_path))
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        port = server.getsockname()[1]
+        assert session.execute("listports", ["127.0.0.1", str(port), "--concurrency", "0"]) == 0
+        while not session.pump(wait=0.05):
+            pass
+    assert f"Port {port} open" in stream.getvalue()
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# Modules only some commands need; importing them at startup delays the first window
+DEFERRED = ["fuzzy", "shlex", "shutil", "bz2", "lzma", "sqlite3", "subprocess", "socket"]
+
+
+def test_import_main_leaves_deferred_modules_unloaded():
+    pytest.importorskip("tkinter")
+    script = f"import sys; import main; print(' '.join(m for m in {DEFERRED!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=SRC, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == []
@@ -0,0 +1,59 @@
+import sqlite3
+import types
+
+import pytest
+
+import main
+import store
+from store import HistoryStore, SettingsFile
+
+
+def finish_open_store(monkeypatch, tmp_path):
+    # Runs TerminalEmulator.open_store without a window and returns the object it filled in
+    monkeypatch.setattr(main, "data_dir", lambda: str(tmp_path))
+    terminal = types.SimpleNamespace(store=None, first_run=None)
+    main.TerminalEmulator.open_store(terminal)
+    return terminal
+
+
+def test_history_records_and_searches(tmp_path):
+    history = HistoryStore(str(tmp_path / "history.db"))
+    for line in ("dir", "edit notes.txt", "edit notes.txt", "diff a b"):
+        history.on_event("command", {"line": line, "cwd": str(tmp_path)})
+        history.on_event("exit", {"code": 0, "cancelled": False, "seconds": 0.1})
+    newest = history.previous()
+    assert newest[1] == "diff a b"
+    assert history.previous(newest[0], newest[1])[1] == "edit notes.txt"
+    assert history.search("NOTES")[1] == "edit notes.txt"
+    assert history.search("no such line") is None
+    history.close()
+
+
+def test_open_store_survives_a_corrupt_database(tmp_path, monkeypatch):
+    (tmp_path / "history.db").write_bytes(b"this is not a database" * 100)
+    terminal = finish_open_store(monkeypatch, tmp_path)
+    assert terminal.store is None
+    assert terminal.first_run is False
+
+
+def test_open_store_survives_sqlite_errors(tmp_path, monkeypatch):
+    def locked(self, address):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(store.HistoryStore, "known_host", locked)
+    terminal = finish_open_store(monkeypatch, tmp_path)
+    assert terminal.store is None
+    assert terminal.first_run is False
+
+
+def test_open_store_remembers_hosts(tmp_path, monkeypatch):
+    assert finish_open_store(monkeypatch, tmp_path).first_run is True
+    assert finish_open_store(monkeypatch, tmp_path).first_run is False
+
+
+def test_settings_file_round_trip(tmp_path):
+    path = str(tmp_path / "settings.json")
+    SettingsFile(path).save("font_size", 14)
+    settings = {"font_size": 12, "theme": 0}
+    SettingsFile(path).load(settings)
+    assert settings == {"font_size": 14, "theme": 0}
+    assert [entry.name for entry in tmp_path.iterdir()] == ["settings.json"]  # No temporary files left behind
@@ -0,0 +1,52 @@
+import codecs
+
+import pytest
+
+import viewer
+from viewer import MappedFile, detect_format
+
+# U+0A41 then U+2000 is 41 0a 00 20 in UTF-16-LE: a "\n\0" that is not a newline
+LINES = ["first line", "ੁ  not a newline", "", "café \U0001f600", "last"]
+
+
+@pytest.fixture(params=[("utf-16-le", codecs.BOM_UTF16_LE), ("utf-16-be", codecs.BOM_UTF16_BE)])
+def utf16_file(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(viewer, "CHECKPOINT_BYTES", 16)  # Several checkpoints even in a small file
+    encoding, bom = request.param
+    path = tmp_path / "text.txt"
+    path.write_bytes(bom + "\r\n".join(LINES * 20).encode(encoding))
+    mapped = MappedFile(str(path))
+    yield encoding, mapped
+    mapped.close()
+
+
+def test_utf16_lines_decode_with_the_byte_order_of_the_bom(utf16_file):
+    encoding, mapped = utf16_file
+    assert (mapped.kind, mapped.encoding) == ("text", encoding)
+    lines = [mapped.decode(data) for _, data in mapped.lines_from(0, 1000)]
+    assert lines == LINES * 20
+
+
+def test_utf16_line_numbers_and_navigation(utf16_file):
+    _, mapped = utf16_file
+    offsets = [offset for offset, _ in mapped.lines_from(0, 1000)]
+    for number, offset in enumerate(offsets, 1):
+        assert mapped.offset_of_line(number) == offset
+        assert mapped.line_number(offset) == number
+        assert mapped.line_start(offset + 3) == offset
+    assert mapped.forward(offsets[0], 7) == offsets[7]
+    assert mapped.back(offsets[9], 4) == offsets[5]
+
+
+def test_detect_format_keeps_utf8_and_binary():
+    assert detect_format(codecs.BOM_UTF8 + b"abc") == ("text", "utf-8-sig")
+    assert detect_format("héllo\n".encode()) == ("text", "utf-8")
+    assert detect_format(b"\x00\x01\x02") == ("binary", None)
+
+
+def test_viewer_opens_the_file_before_its_window(tmp_path, monkeypatch):
+    windows = []
+    monkeypatch.setattr(viewer.tk.Toplevel, "__init__", lambda self, master=None: windows.append(self))
+    with pytest.raises(OSError):
+        viewer.FileViewer(None, str(tmp_path), "black", "white", ("Courier", 10))
+    assert windows == []